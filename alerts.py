@@ -0,0 +1,169 @@
+"""Incremental per-patient alerting.
+
+Each ingest advances one PatientAlertState row instead of rescanning sensor
+data. Completed days (every day before the newest one ingested) are read from
+the feature store once and folded into exponentially weighted mean/variance
+trackers per metric. The EWMA mean is the one-step forecast for the next
+day, so a day's residual is value - forecast and its z-score is the residual
+over the EW standard deviation:
+
+- gait/cadence below forecast (z <= -ALERT_Z) for ALERT_STREAK days in a row
+- gait/cadence anomaly (|z| >= ALERT_Z_ANOMALY) on a single day
+- no patient_report for ALERT_REPORT_DAYS days
+
+Triggered alerts go to the alerts table (unique per patient, kind and day),
+so the dashboard reads them with one indexed query. Data arriving late for a
+day that was already folded updates the feature store but not the EWMAs.
+"""
+import copy
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import PatientAlertState, Alert, PatientFeatureDay, SensorStream
+from features import FeatureAccumulator
+
+ALPHA = float(os.getenv("ALERT_EWMA_ALPHA", "0.3"))
+Z_BELOW = float(os.getenv("ALERT_Z", "1.5"))
+Z_ANOMALY = float(os.getenv("ALERT_Z_ANOMALY", "3.0"))
+STREAK = int(os.getenv("ALERT_STREAK", "2"))
+MIN_DAYS = int(os.getenv("ALERT_MIN_DAYS", "5"))  # days of history before z-scores are trusted
+REPORT_DAYS = int(os.getenv("ALERT_REPORT_DAYS", "2"))
+OVERDUE_CHECK_SECONDS = float(os.getenv("ALERT_OVERDUE_CHECK_SECONDS", "300"))
+
+# alert metric -> (feature_store feature, label)
+METRICS = {"gait": ("acc_mag_mean", "Gait activity"), "cadence": ("cadence_est", "Cadence")}
+
+def _state_for(db: Session, patient_id: int) -> PatientAlertState:
+    row = db.query(PatientAlertState).filter(PatientAlertState.patient_id == patient_id).first()
+    if row is None:
+        last_report = db.query(func.max(SensorStream.timestamp)).filter(
+            SensorStream.patient_id == patient_id, SensorStream.sensor_type == "patient_report").scalar()
+        row = PatientAlertState(patient_id=patient_id, state={}, last_report_at=last_report or datetime.utcnow())
+        db.add(row)
+    return row
+
+def _fold(tracker: dict, value: float) -> float | None:
+    """Advance one EWMA tracker by a day's value; returns that day's z-score against the prior forecast."""
+    n = tracker.get("n", 0)
+    if n == 0:
+        tracker.update(mean=value, var=0.0, n=1, streak=0)
+        return None
+    mean, var = tracker["mean"], tracker["var"]
+    z = (value - mean) / math.sqrt(var) if n >= MIN_DAYS and var > 0 else None
+    diff = value - mean
+    incr = ALPHA * diff
+    tracker.update(mean=mean + incr, var=(1 - ALPHA) * (var + diff * incr), n=n + 1)
+    return z
+
+def _day_alerts(patient_id: int, day: date, state: dict, feats: dict) -> list[dict]:
+    out = []
+    for name, (feature, label) in METRICS.items():
+        value = feats.get(feature)
+        if value is None or not math.isfinite(value):
+            continue
+        tracker = state.setdefault(name, {})
+        forecast = tracker.get("mean")
+        z = _fold(tracker, value)
+        if z is None:
+            continue
+        tracker["streak"] = tracker.get("streak", 0) + 1 if z <= -Z_BELOW else 0
+        if tracker["streak"] == STREAK:
+            out.append({"patient_id": patient_id, "kind": f"{name}_below_forecast", "severity": "warning", "day": day,
+                        "value": round(z, 2),
+                        "message": f"{label} below forecast for {STREAK} consecutive days "
+                                   f"({value:.3g} vs {forecast:.3g} on {day})"})
+        if abs(z) >= Z_ANOMALY:
+            out.append({"patient_id": patient_id, "kind": f"{name}_anomaly", "severity": "error", "day": day,
+                        "value": round(z, 2),
+                        "message": f"{label} anomaly on {day}: {value:.3g} (z = {z:+.1f})"})
+    return out
+
+def _insert_new(db: Session, candidates: list[dict]) -> int:
+    if not candidates:
+        return 0
+    pids = {c["patient_id"] for c in candidates}
+    days = {c["day"] for c in candidates}
+    seen = set(db.query(Alert.patient_id, Alert.kind, Alert.day).filter(
+        Alert.patient_id.in_(pids), Alert.day.in_(days)))
+    new = [Alert(**c) for c in candidates if (c["patient_id"], c["kind"], c["day"]) not in seen]
+    db.add_all(new)
+    return len(new)
+
+def on_ingest(db: Session, patient_id: int, days: list[date]) -> int:
+    """Advance the patient's alert state after feature_store.update touched `days`; returns new alerts.
+    Caller commits."""
+    if not days:
+        return 0
+    row = _state_for(db, patient_id)
+    newest = max(days)
+    q = db.query(PatientFeatureDay.day, PatientFeatureDay.stats).filter(
+        PatientFeatureDay.patient_id == patient_id, PatientFeatureDay.day < newest)
+    if row.last_folded_day is not None:
+        q = q.filter(PatientFeatureDay.day > row.last_folded_day)
+    state = copy.deepcopy(row.state or {})  # trackers are mutated in place; keep the loaded value pristine
+    candidates = []
+    for day, stats in q.order_by(PatientFeatureDay.day):
+        candidates += _day_alerts(patient_id, day, state, FeatureAccumulator.from_state(stats).features())
+        row.last_folded_day = day
+    row.state = state
+    row.updated_at = datetime.utcnow()
+    db.flush()
+    return _insert_new(db, candidates) + check_overdue(db, patient_ids=[patient_id])
+
+def record_report(db: Session, patient_id: int, at: datetime | None = None):
+    """A patient_report arrived: reset the missed-report clock and close the open missed-report alert."""
+    row = _state_for(db, patient_id)
+    row.last_report_at = at or datetime.utcnow()
+    db.query(Alert).filter(Alert.patient_id == patient_id, Alert.kind == "missed_report",
+                           Alert.acknowledged.is_(False)).update({"acknowledged": True}, synchronize_session=False)
+
+def check_overdue(db: Session, now: datetime | None = None, patient_ids: list[int] | None = None) -> int:
+    """Raise one missed_report alert per reporting gap longer than REPORT_DAYS. Caller commits."""
+    now = now or datetime.utcnow()
+    q = db.query(PatientAlertState).filter(
+        PatientAlertState.last_report_at < now - timedelta(days=REPORT_DAYS),
+        (PatientAlertState.report_alerted_at.is_(None)) |
+        (PatientAlertState.report_alerted_at != PatientAlertState.last_report_at))
+    if patient_ids is not None:
+        q = q.filter(PatientAlertState.patient_id.in_(patient_ids))
+    candidates = []
+    for row in q:
+        gap = (now - row.last_report_at).days
+        candidates.append({"patient_id": row.patient_id, "kind": "missed_report", "severity": "warning",
+                           "day": now.date(), "value": gap,
+                           "message": f"No pain/mood report for {gap} days"})
+        row.report_alerted_at = row.last_report_at
+    db.flush()
+    return _insert_new(db, candidates)
+
+_last_overdue_check = 0.0
+
+def maybe_check_overdue(db: Session) -> int:
+    """check_overdue across all patients at most every OVERDUE_CHECK_SECONDS per process (dashboard reruns)."""
+    global _last_overdue_check
+    if time.monotonic() - _last_overdue_check < OVERDUE_CHECK_SECONDS:
+        return 0
+    _last_overdue_check = time.monotonic()
+    n = check_overdue(db)
+    db.commit()
+    return n
+
+def open_alerts(db: Session, patient_id: int, limit: int = 20) -> list[Alert]:
+    return db.query(Alert).filter(Alert.patient_id == patient_id, Alert.acknowledged.is_(False)).order_by(
+        Alert.created_at.desc(), Alert.id.desc()).limit(limit).all()
+
+def open_counts(db: Session, patient_ids: list[int]) -> dict[int, int]:
+    """{patient_id: open alert count} for a page of patients, in one grouped query."""
+    if not patient_ids:
+        return {}
+    return dict(db.query(Alert.patient_id, func.count(Alert.id)).filter(
+        Alert.patient_id.in_(patient_ids), Alert.acknowledged.is_(False)).group_by(Alert.patient_id))
+
+def acknowledge(db: Session, patient_id: int) -> int:
+    n = db.query(Alert).filter(Alert.patient_id == patient_id, Alert.acknowledged.is_(False)).update(
+        {"acknowledged": True}, synchronize_session=False)
+    db.commit()
+    return n
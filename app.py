@@ -1,18 +1,81 @@
 import os
+import threading
+from types import SimpleNamespace
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
 
-from database import SessionLocal, engine, Base
+from database import session_scope, pool_metrics, engine, Base, upgrade_schema
 from models_root import User, PatientProfile, SensorStream
-from util.auth import authenticate
-from models.model import TwinModel
+from util import perf
+from models.model import TwinModel, current_version
+from prediction_cache import prediction_cache
+# plotly, pandas (feature_store/timeseries), passlib and torch are imported where first needed so the
+# login page comes up without them; warm_up_in_background() loads them once the first page is out
 
 # -------------------- Streamlit Config --------------------
 st.set_page_config(page_title="Digital-Twin Recovery Companion", layout="wide")
 
-# Ensure DB tables exist
-Base.metadata.create_all(bind=engine)
+@st.cache_resource
+def init_db():
+    # once per process rather than on every rerun
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    return True
+
+init_db()
+
+@st.cache_resource(max_entries=2)
+def load_twin_model(version):
+    # one TwinModel per promoted version; the loaded engine itself lives in the numpy_model/torch_model registry
+    return TwinModel().warm_up()
+
+def get_twin_model():
+    # keyed on the CURRENT pointer, so promoting a retrained version is picked up on the next rerun
+    return load_twin_model(current_version())
+
+@st.cache_resource
+def warm_up_in_background():
+    def warm():
+        import plotly.graph_objects  # noqa: F401
+        import feature_store, timeseries  # noqa: F401
+        from util.auth import get_pwd_context
+        get_pwd_context()
+        get_twin_model()
+    t = threading.Thread(target=warm, name="warm-up", daemon=True)
+    t.start()
+    return t
+
+def current_patient_id(db):
+    profile = db.query(PatientProfile.id).filter(PatientProfile.user_id == st.session_state.user.id).first()
+    return profile.id if profile else None
+
+def patient_features(db, patient_id):
+    # persisted feature store first; session features cover users without a patient profile
+    import feature_store
+    feats = feature_store.latest_features(db, patient_id) if patient_id else None
+    return feats or st.session_state.get("latest_feats")
+
+def render_progress(db, patient_id, key):
+    from timeseries import PROGRESS_METRICS, progress_series
+    metric = st.selectbox("Metric", options=list(PROGRESS_METRICS), format_func=PROGRESS_METRICS.get, key=f"{key}_metric")
+    with perf.span("progress_series"):
+        traces = progress_series(db, patient_id, metric) if patient_id else {}
+    if not traces:
+        st.info("No recorded data yet. Upload a wearable CSV to see progress.")
+        return
+    with perf.span("plotly.progress"):
+        fig = go.Figure()
+        for name, (x, y) in traces.items():
+            fig.add_trace(go.Scatter(x=x, y=y, mode="lines+markers", name=name))
+        fig.update_layout(margin=dict(l=10, r=10, t=30, b=10), height=320)
+        st.plotly_chart(fig, use_container_width=True)
+
+def what_if_curve(db, patient_id, feats):
+    model = get_twin_model()
+    scenario = {"extra_minutes_balance": list(range(0, 31))}
+    def compute():
+        curve = model.sweep({patient_id: feats}, scenario["extra_minutes_balance"])
+        return {k: curve[k][0].tolist() for k in ("gait_speed_change_pct", "adherence_score")}
+    return prediction_cache.get_or_compute(db, patient_id, model.weights, feats, scenario, compute)
 
 # -------------------- Session State --------------------
 if "user" not in st.session_state:
@@ -20,131 +83,225 @@ if "user" not in st.session_state:
 if "role" not in st.session_state:
     st.session_state.role = None
 
-# -------------------- Sidebar (Login / Logout) --------------------
-with st.sidebar:
-    st.title("Digital-Twin")
+# -------------------- Per-rerun DB session --------------------
+# every DB access in this script run shares one pooled session, closed when the run ends (incl. st.stop/rerun);
+# the run's spans and SQL timings are collected into one perf trace
+with perf.trace("rerun"), session_scope() as db:
+
+    # -------------------- Sidebar (Login / Logout) --------------------
+    with st.sidebar:
+        st.title("Digital-Twin")
+
+        if st.session_state.user:
+            st.success(f"Logged in as: {st.session_state.user.email} ({st.session_state.role})")
+            if st.button("Logout", use_container_width=True):
+                st.session_state.user = None
+                st.session_state.role = None
+                st.rerun()
+        else:
+            st.subheader("Login")
+            email = st.text_input("Email", value="patient@example.com")
+            password = st.text_input("Password", value="changeme", type="password")
+            role = st.selectbox("Role", options=["patient", "clinician", "admin"])
 
-    if st.session_state.user:
-        st.success(f"Logged in as: {st.session_state.user.email} ({st.session_state.role})")
-        if st.button("Logout", use_container_width=True):
-            st.session_state.user = None
-            st.session_state.role = None
-            st.rerun()
-    else:
-        st.subheader("Login")
-        email = st.text_input("Email", value="patient@example.com")
-        password = st.text_input("Password", value="changeme", type="password")
-        role = st.selectbox("Role", options=["patient", "clinician", "admin"])
+            if st.button("Sign in", use_container_width=True):
+                from util.auth import authenticate
+                user = authenticate(db, email, password)
 
-        if st.button("Sign in", use_container_width=True):
-            db = SessionLocal()
-            user = authenticate(db, email, password)
+                if user and (role == user.role or role == "admin"):
+                    # plain snapshot: an ORM instance would outlive this rerun's session
+                    st.session_state.user = SimpleNamespace(id=user.id, email=user.email, role=user.role)
 
-            if user and (role == user.role or role == "admin"):
-                st.session_state.user = user
+                    from audit import log_action
+                    log_action(db, user.id, 'login', {'role': user.role})
 
-                from audit import log_action
-                log_action(db, user.id, 'login', {'role': user.role})
+                    st.session_state.role = user.role
+                    st.success("Login successful")
+                    st.rerun()
+                else:
+                    st.error("Invalid credentials or role mismatch")
 
-                st.session_state.role = user.role
-                st.success("Login successful")
-                db.close()
-                st.experimental_rerun()
-            else:
-                st.error("Invalid credentials or role mismatch")
-                db.close()
-
-# -------------------- Main Title --------------------
-st.title("Digital-Twin Recovery Companion")
-
-if not st.session_state.user:
-    st.info("Please log in from the sidebar to continue.")
-    st.stop()
-
-# -------------------- Role-based Tabs --------------------
-role = st.session_state.user.role if hasattr(st.session_state.user, 'role') else 'patient'
-
-if role == 'patient':
-    tab_labels = ["Patient Dashboard", "Data Ingestion"]
-elif role == 'clinician':
-    tab_labels = ["Clinician Dashboard", "Data Ingestion"]
-elif role == 'admin':
-    tab_labels = ["Clinician Dashboard", "Data Ingestion", "Admin"]
-else:
-    tab_labels = ["Patient Dashboard"]
-
-tabs = st.tabs(tab_labels)
-
-# ==========================================================
-# PATIENT DASHBOARD
-# ==========================================================
-with tabs[0]:
-    if role in ['clinician', 'admin']:
-        st.subheader('Generate Patient Report')
-        patient_name = st.text_input('Patient Name for Report')
-        if st.button('Download PDF Report'):
-            from report import generate_report
-            metrics = {
-                'Gait Speed Change %': 12.5,
-                'Adherence Score': 85,
-                'Next Recommended Step': 'Increase balance training'
-            }
-            pdf_bytes = generate_report(patient_name or 'Unknown', metrics)
-            st.download_button(
-                'Download PDF',
-                data=pdf_bytes,
-                file_name='recovery_report.pdf',
-                mime='application/pdf'
-            )
+    # -------------------- Main Title --------------------
+    st.title("Digital-Twin Recovery Companion")
 
-    st.subheader("My Recovery")
-    col1, col2 = st.columns([2, 1])
+    if not st.session_state.user:
+        st.info("Please log in from the sidebar to continue.")
+        warm_up_in_background()
+        st.stop()
 
-    # Progress Chart
-    with col1:
-        progress_data = pd.DataFrame({
-            "day": list(range(0, 21)),
-            "value": [0.4 + i * 0.02 for i in range(0, 21)]
-        })
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=progress_data["day"], y=progress_data["value"],
-            mode="lines", name="Recovery Score"
-        ))
-        fig.update_layout(margin=dict(l=10, r=10, t=30, b=10), height=320)
-        st.plotly_chart(fig, use_container_width=True)
+    import plotly.graph_objects as go
+    warm_up_in_background()
+
+    # -------------------- Role-based Tabs --------------------
+    role = st.session_state.user.role if hasattr(st.session_state.user, 'role') else 'patient'
 
-        st.markdown("#### Digital Twin (3D)")
-        xs = [0, 0, -0.3, 0, 0.3, 0, 0, -0.2, 0, 0.2]
-        ys = [1.8, 1.4, 1.1, 1.4, 1.1, 1.4, 0.8, 0.2, 0.8, 0.2]
-        zs = [0] * 10
-        fig3d = go.Figure(data=[go.Scatter3d(x=xs, y=ys, z=zs, mode='lines')])
-        fig3d.update_layout(
-            scene=dict(xaxis=dict(visible=False), yaxis=dict(visible=False), zaxis=dict(visible=False)),
-            margin=dict(l=10, r=10, t=10, b=10),
-            height=320
-        )
-        st.plotly_chart(fig3d, use_container_width=True)
-
-    # What-if Simulation + Mood Report
-    with col2:
-        st.markdown("#### What-if Simulation")
-        extra_minutes = st.slider("Extra balance training (min/day)", 0, 30, 5)
-        run = st.button("Run Simulation", use_container_width=True)
-        if run:
-            model = TwinModel()
-            pred = model.predict(patient_id=1, scenario={"extra_minutes_balance": extra_minutes})
-            from audit import log_action
-            log_action(SessionLocal(), st.session_state.user.id, 'prediction', {'extra_minutes': extra_minutes})
-            st.metric("Predicted gait speed Δ", f"{pred['gait_speed_change_pct']} %")
-            st.metric("Adherence score", f"{pred['adherence_score']}")
-
-        st.markdown("---")
-        st.markdown("#### Report Pain / Mood")
-        pain = st.slider("Pain", 0, 10, 2)
-        mood = st.select_slider("Mood", options=["sad", "ok", "good"], value="ok")
-        if st.button("Submit Report", use_container_width=True):
-            db = SessionLocal()
+    if role == 'patient':
+        tab_labels = ["Patient Dashboard", "Data Ingestion"]
+    elif role == 'clinician':
+        tab_labels = ["Clinician Dashboard", "Data Ingestion"]
+    elif role == 'admin':
+        tab_labels = ["Clinician Dashboard", "Patient Oversight", "Data Ingestion", "Admin", "Performance"]
+    else:
+        tab_labels = ["Patient Dashboard"]
+
+    tabs = st.tabs(tab_labels)
+
+    # ==========================================================
+    # PATIENT DASHBOARD
+    # ==========================================================
+    with tabs[0]:
+        if role in ['clinician', 'admin']:
+            st.subheader('Generate Patient Report')
+            from patient_directory import list_patients
+            report_search = st.text_input('Find patient for report', key='report_search')
+            report_patients = dict(list_patients(db, report_search)[0])
+            report_pid = st.selectbox('Patient', options=list(report_patients), format_func=report_patients.get, key='report_pid')
+            if report_pid and st.button('Download PDF Report'):
+                from report import patient_report
+                st.download_button(
+                    'Download PDF',
+                    data=patient_report(db, report_pid),
+                    file_name=f'recovery_report_{report_pid}.pdf',
+                    mime='application/pdf'
+                )
+            if st.button('Export weekly reports for all patients (ZIP)'):
+                from report import export_cohort
+                all_ids = [i for (i,) in db.query(PatientProfile.id).order_by(PatientProfile.id)]
+                zip_bytes, report_stats = export_cohort(db, all_ids)
+                st.caption(f"{report_stats['reports']} reports ({report_stats['rendered']} rendered, "
+                           f"{report_stats['cached']} cached), {report_stats['reports_per_min']} reports/min")
+                st.download_button('Download ZIP', data=zip_bytes, file_name='cohort_reports.zip', mime='application/zip')
+
+        st.subheader("My Recovery")
+        col1, col2 = st.columns([2, 1])
+
+        # Progress Chart
+        with col1:
+            render_progress(db, current_patient_id(db), key="my_progress")
+
+            st.markdown("#### Digital Twin (3D)")
+            xs = [0, 0, -0.3, 0, 0.3, 0, 0, -0.2, 0, 0.2]
+            ys = [1.8, 1.4, 1.1, 1.4, 1.1, 1.4, 0.8, 0.2, 0.8, 0.2]
+            zs = [0] * 10
+            fig3d = go.Figure(data=[go.Scatter3d(x=xs, y=ys, z=zs, mode='lines')])
+            fig3d.update_layout(
+                scene=dict(xaxis=dict(visible=False), yaxis=dict(visible=False), zaxis=dict(visible=False)),
+                margin=dict(l=10, r=10, t=10, b=10),
+                height=320
+            )
+            st.plotly_chart(fig3d, use_container_width=True)
+
+        # What-if Simulation + Mood Report
+        with col2:
+            st.markdown("#### What-if Simulation")
+            extra_minutes = st.slider("Extra balance training (min/day)", 0, 30, 5)
+            show_band = st.checkbox("Show 90% uncertainty band", value=True)
+            run = st.button("Run Simulation", use_container_width=True)
+            if run:
+                # whole 0..30 min dose-response curve from a single batched (and cached) forward pass
+                pid = current_patient_id(db)
+                feats = patient_features(db, pid)
+                curve = what_if_curve(db, pid, feats)
+                gait = curve["gait_speed_change_pct"]
+                adherence = curve["adherence_score"]
+                from audit import log_action
+                log_action(db, st.session_state.user.id, 'prediction', {'extra_minutes': extra_minutes})
+                st.metric("Predicted gait speed Δ", f"{gait[extra_minutes]} %")
+                st.metric("Adherence score", f"{adherence[extra_minutes]}")
+                fig_curve = go.Figure()
+                if show_band:
+                    # Monte Carlo over the patient's day-to-day feature spread; seeded, so reruns draw the same band
+                    import feature_store
+                    spread = feature_store.feature_spread(db, pid) if pid else None
+                    bands = get_twin_model().predict_uncertainty(feats, range(0, 31), spread=spread, seed=pid or 0)
+                    gait_band = bands["gait_speed_change_pct"]
+                    fig_curve.add_trace(go.Scatter(x=list(range(0, 31)), y=gait_band["p95"], mode="lines",
+                                                   line=dict(width=0), showlegend=False, hoverinfo="skip"))
+                    fig_curve.add_trace(go.Scatter(x=list(range(0, 31)), y=gait_band["p5"], mode="lines", line=dict(width=0),
+                                                   fill="tonexty", name="90% band"))
+                    st.caption(f"90% band at {extra_minutes} min: {gait_band['p5'][extra_minutes]:.2f} – "
+                               f"{gait_band['p95'][extra_minutes]:.2f} % ({bands['samples']} samples)")
+                fig_curve.add_trace(go.Scatter(x=list(range(0, 31)), y=gait, mode="lines", name="Gait speed Δ %"))
+                fig_curve.add_trace(go.Scatter(x=[extra_minutes], y=[gait[extra_minutes]], mode="markers", name="Selected"))
+                fig_curve.update_layout(margin=dict(l=10, r=10, t=30, b=10), height=240, xaxis_title="Extra min/day")
+                st.plotly_chart(fig_curve, use_container_width=True)
+
+            st.markdown("---")
+            st.markdown("#### Report Pain / Mood")
+            pain = st.slider("Pain", 0, 10, 2)
+            mood = st.select_slider("Mood", options=["sad", "ok", "good"], value="ok")
+            if st.button("Submit Report", use_container_width=True):
+                patient_profile = db.query(PatientProfile).filter(
+                    PatientProfile.user_id == st.session_state.user.id
+                ).first()
+                if not patient_profile:
+                    patient_profile = PatientProfile(user_id=st.session_state.user.id, demographics={}, medical_history="")
+                    db.add(patient_profile)
+                    db.commit()
+                    db.refresh(patient_profile)
+                    from patient_directory import invalidate
+                    invalidate()
+                s = SensorStream(patient_id=patient_profile.id, sensor_type="patient_report", payload={"pain": pain, "mood": mood})
+                db.add(s)
+                import alerts
+                alerts.record_report(db, patient_profile.id, s.timestamp)
+                db.commit()
+                st.success("Thanks! Your report was saved.")
+
+    # ==========================================================
+    # CLINICIAN DASHBOARD
+    # ==========================================================
+    with tabs[1]:
+        st.subheader("Patient Oversight")
+        from patient_directory import list_patients, PAGE_SIZE
+        search_col, page_col = st.columns([3, 1])
+        search = search_col.text_input("Search patients (name or email)", key="patient_search")
+        page = page_col.number_input("Page", min_value=1, value=1, step=1, key="patient_page") - 1
+        import alerts
+        alerts.maybe_check_overdue(db)
+        patients, total = list_patients(db, search, page)
+        counts = alerts.open_counts(db, [p for p, _ in patients])
+        labels = {p: f"{label}  ⚠ {counts[p]}" if counts.get(p) else label for p, label in patients}
+        ids = list(labels)
+
+        if not ids:
+            st.info("No patients found yet. Use Admin tab to create or run seed.py.")
+        else:
+            st.caption(f"{total} patients, page {page + 1} of {(total + PAGE_SIZE - 1) // PAGE_SIZE}")
+            pid = st.selectbox("Select Patient", options=ids, format_func=labels.get)
+            st.markdown("#### Alerts")
+            open_alerts = alerts.open_alerts(db, pid)
+            if not open_alerts:
+                st.success("No open alerts")
+            for a in open_alerts:
+                (st.error if a.severity == "error" else st.warning)(f"{a.message} ({a.day})")
+            if open_alerts and st.button("Acknowledge alerts", key="ack_alerts"):
+                alerts.acknowledge(db, pid)
+                st.rerun()
+
+            st.markdown("#### Patient Progress")
+            render_progress(db, pid, key="patient_progress")
+
+
+    # ==========================================================
+    # DATA INGESTION
+    # ==========================================================
+    with tabs[2]:
+        st.subheader("Ingest Wearable CSV")
+        st.write("Upload a CSV with columns: `timestamp, accel_x, accel_y, accel_z, emg, spo2, hr, step_count`. We'll compute features and store every row in the DB.")
+        uploaded = st.file_uploader("Choose CSV file", type=["csv"])
+        feats_state_key = "latest_feats"
+
+        # the uploader keeps its file across reruns; ingest each upload once, or the feature store counts it again
+        upload_id = uploaded and (getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}")
+        ingested = st.session_state.get("ingested_upload")
+        if uploaded is not None and ingested and ingested[0] == upload_id:
+            head_df, feats, stats = ingested[1]
+            st.info(f"Already ingested: {stats['rows']} rows from {uploaded.name}.")
+            st.dataframe(head_df)
+            st.json(feats)
+        elif uploaded is not None:
+            from data_ingestion import parse_and_store_stream
             patient_profile = db.query(PatientProfile).filter(
                 PatientProfile.user_id == st.session_state.user.id
             ).first()
@@ -153,128 +310,102 @@ with tabs[0]:
                 db.add(patient_profile)
                 db.commit()
                 db.refresh(patient_profile)
-            s = SensorStream(patient_id=patient_profile.id, sensor_type="patient_report", payload={"pain": pain, "mood": mood})
-            db.add(s)
-            db.commit()
-            db.close()
-            st.success("Thanks! Your report was saved.")
-
-# ==========================================================
-# CLINICIAN DASHBOARD
-# ==========================================================
-with tabs[1]:
-    st.subheader("Patient Oversight")
-    db = SessionLocal()
-    patients = db.query(PatientProfile).all()
-    names, ids = [], []
-    for p in patients:
-        user = db.query(User).filter(User.id == p.user_id).first()
-        label = user.full_name or user.email
-        names.append(label)
-        ids.append(p.id)
-
-    if not ids:
-        st.info("No patients found yet. Use Admin tab to create or run seed.py.")
-    else:
-        pid = st.selectbox("Select Patient", options=ids, format_func=lambda i: names[ids.index(i)])
-        st.markdown("#### Alerts")
-        st.warning("Gait velocity below forecast for 2 consecutive days")
-        st.warning("Missed physio session yesterday")
-
-        st.markdown("#### Patient Progress")
-        df = pd.DataFrame({
-            "day": list(range(0, 21)),
-            "value": [0.45 + i * 0.018 for i in range(0, 21)]
-        })
-        fig2 = go.Figure()
-        fig2.add_trace(go.Scatter(x=df["day"], y=df["value"], mode="lines", name="Recovery"))
-        fig2.update_layout(margin=dict(l=10, r=10, t=30, b=10), height=320)
-        st.plotly_chart(fig2, use_container_width=True)
-
-    db.close()
-
-# ==========================================================
-# DATA INGESTION
-# ==========================================================
-with tabs[2]:
-    st.subheader("Ingest Wearable CSV")
-    st.write("Upload a CSV with columns: `timestamp, accel_x, accel_y, accel_z, emg, spo2, hr, step_count`. We'll compute features and store a sample in the DB.")
-    uploaded = st.file_uploader("Choose CSV file", type=["csv"])
-    feats_state_key = "latest_feats"
-
-    if uploaded is not None:
-        from data_ingestion import parse_and_store
-        db = SessionLocal()
-        patient_profile = db.query(PatientProfile).filter(
-            PatientProfile.user_id == st.session_state.user.id
-        ).first()
-        if not patient_profile:
-            patient_profile = PatientProfile(user_id=st.session_state.user.id, demographics={}, medical_history="")
-            db.add(patient_profile)
-            db.commit()
-            db.refresh(patient_profile)
-        try:
-            head_df, feats = parse_and_store(uploaded.read(), patient_profile.id, db)
-            st.session_state[feats_state_key] = feats
-            st.success("Data ingested! Preview below and derived features computed.")
-            from audit import log_action
-            log_action(db, st.session_state.user.id, 'csv_upload', {'rows': len(head_df)})
-            st.dataframe(head_df)
-            st.json(feats)
-        except Exception as e:
-            st.error(f"Failed to parse CSV: {e}")
-        finally:
-            db.close()
-
-    st.markdown("#### Run Prediction with Derived Features")
-    extra2 = st.slider("Extra balance training (min/day)", 0, 30, 10, key="extra2")
-    if st.button("Predict from Uploaded Features", use_container_width=True):
-        feats = st.session_state.get(feats_state_key)
-        if not feats:
-            st.warning("Please upload CSV first to compute features.")
-        else:
-            model = TwinModel()
-            res = model.predict(patient_id=1, scenario={"extra_minutes_balance": extra2}, feats=feats)
-            from audit import log_action
-            log_action(SessionLocal(), st.session_state.user.id, 'prediction', {'extra_minutes': extra2})
-            st.metric("Predicted gait speed Δ", f"{res['gait_speed_change_pct']} %")
-            st.metric("Adherence score", f"{res['adherence_score']}")
-
-# ==========================================================
-# ADMIN
-# ==========================================================
-if role == 'admin' and len(tabs) > 2:
-    with tabs[3]:
-        st.subheader("Admin")
-        db = SessionLocal()
-        st.markdown("Create Clinician/Patient Users")
-        full_name = st.text_input("Full name")
-        email_new = st.text_input("Email")
-        pw_new = st.text_input("Password", type="password")
-        role_new = st.selectbox("Role", ["patient", "clinician"])
-
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-        if st.button("Create User", use_container_width=True):
-            if not email_new or not pw_new:
-                st.error("Email and password required")
+                from patient_directory import invalidate
+                invalidate()
+            try:
+                head_df, feats, stats = parse_and_store_stream(uploaded, patient_profile.id, db)
+                st.session_state[feats_state_key] = feats
+                st.session_state.ingested_upload = (upload_id, (head_df, feats, stats))
+                st.success(f"Data ingested! {stats['rows']} rows at {stats['rows_per_sec']} rows/sec. Preview below and derived features computed.")
+                from audit import log_action
+                log_action(db, st.session_state.user.id, 'csv_upload', {'rows': stats['rows']})
+                st.dataframe(head_df)
+                st.json(feats)
+            except Exception as e:
+                db.rollback()
+                st.error(f"Failed to parse CSV: {e}")
+
+        st.markdown("#### Run Prediction with Derived Features")
+        extra2 = st.slider("Extra balance training (min/day)", 0, 30, 10, key="extra2")
+        if st.button("Predict from Uploaded Features", use_container_width=True):
+            pid = current_patient_id(db)
+            feats = patient_features(db, pid)
+            if not feats:
+                st.warning("Please upload CSV first to compute features.")
             else:
-                exists = db.query(User).filter(User.email == email_new).first()
-                if exists:
-                    st.error("Email already exists")
+                model = get_twin_model()
+                scenario = {"extra_minutes_balance": extra2}
+                res = prediction_cache.get_or_compute(db, pid, model.weights, feats, scenario,
+                                                      lambda: model.predict(patient_id=pid, scenario=scenario, feats=feats))
+                from audit import log_action
+                log_action(db, st.session_state.user.id, 'prediction', {'extra_minutes': extra2})
+                st.metric("Predicted gait speed Δ", f"{res['gait_speed_change_pct']} %")
+                st.metric("Adherence score", f"{res['adherence_score']}")
+
+    # ==========================================================
+    # ADMIN
+    # ==========================================================
+    if role == 'admin' and len(tabs) > 2:
+        with tabs[3]:
+            st.subheader("Admin")
+            st.markdown("Create Clinician/Patient Users")
+            full_name = st.text_input("Full name")
+            email_new = st.text_input("Email")
+            pw_new = st.text_input("Password", type="password")
+            role_new = st.selectbox("Role", ["patient", "clinician"])
+
+            if st.button("Create User", use_container_width=True):
+                if not email_new or not pw_new:
+                    st.error("Email and password required")
                 else:
-                    u = User(email=email_new, hashed_password=pwd_context.hash(pw_new), role=role_new, full_name=full_name)
-                    db.add(u)
-                    db.commit()
-                    db.refresh(u)
-                    if role_new == "patient":
-                        p = PatientProfile(user_id=u.id, demographics={}, medical_history="")
-                        db.add(p)
+                    exists = db.query(User).filter(User.email == email_new).first()
+                    if exists:
+                        st.error("Email already exists")
+                    else:
+                        from util.auth import hash_password
+                        u = User(email=email_new, hashed_password=hash_password(pw_new), role=role_new, full_name=full_name)
+                        db.add(u)
                         db.commit()
-                    st.success(f"Created {role_new}: {email_new}")
-
-        st.markdown("---")
-        st.markdown("### System Info")
-        st.code(f"DB = {os.getenv('DATABASE_URL', 'sqlite:///./data/app.db')}")
-        db.close()
+                        db.refresh(u)
+                        if role_new == "patient":
+                            p = PatientProfile(user_id=u.id, demographics={}, medical_history="")
+                            db.add(p)
+                            db.commit()
+                            from patient_directory import invalidate
+                            invalidate()
+                        st.success(f"Created {role_new}: {email_new}")
+
+            st.markdown("---")
+            st.markdown("### System Info")
+            st.code(f"DB = {os.getenv('DATABASE_URL', 'sqlite:///./data/app.db')}")
+            import sys
+            from audit import audit_writer
+            model_info = {"engine": get_twin_model().engine_name, "version": get_twin_model().version or "bundled"}
+            if "models.torch_model" in sys.modules:  # don't pull torch in just to report on it
+                model_info["torch_registry"] = sys.modules["models.torch_model"].registry_stats()
+            st.json({"model": model_info, "prediction_cache": prediction_cache.stats(),
+                     "db_pool": pool_metrics(), "audit": audit_writer.metrics()})
+
+    # ==========================================================
+    # PERFORMANCE (admin only)
+    # ==========================================================
+    if role == 'admin' and len(tabs) > 4:
+        with tabs[4]:
+            st.subheader("Performance")
+            tracing = st.toggle("Tracing enabled", value=perf.enabled())
+            perf.set_enabled(tracing)
+            durations = perf.span_durations()
+            st.caption(f"{len(perf.traces)} reruns buffered (max {perf.PERF_TRACES}); this rerun is recorded when it finishes.")
+            if st.button("Reset traces"):
+                perf.reset()
+            names = [n for n, v in durations.items() if v]
+            if names:
+                summary = [{"span": n, "count": len(v), "p50_ms": round(sorted(v)[len(v) // 2], 3),
+                            "max_ms": round(max(v), 3)} for n, v in ((n, durations[n]) for n in names)]
+                st.dataframe(summary, use_container_width=True)
+                chosen = st.selectbox("Latency histogram", options=names)
+                fig_hist = go.Figure(data=[go.Histogram(x=durations[chosen], nbinsx=40)])
+                fig_hist.update_layout(margin=dict(l=10, r=10, t=30, b=10), height=280, xaxis_title="ms")
+                st.plotly_chart(fig_hist, use_container_width=True)
+            st.markdown("#### Slowest queries")
+            st.dataframe(perf.slowest_queries(), use_container_width=True)
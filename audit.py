@@ -1,8 +1,135 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
 
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_FLUSH_MS = int(os.getenv("AUDIT_FLUSH_MS", "250"))  # max time an entry waits in the queue
+AUDIT_BATCH = int(os.getenv("AUDIT_BATCH", "500"))  # flush early once this many entries are queued
+AUDIT_FALLBACK_PATH = os.getenv("AUDIT_FALLBACK_PATH", os.path.join("data", "audit_fallback.jsonl"))
+_STOP = object()  # queued by close(): the writer finishes its batch and exits
+
+class AuditWriter:
+    """Bounded in-process queue drained by a background thread into bulk AuditLog inserts.
+
+    If the DB write fails, or the queue is full, entries are appended to a local
+    JSONL file instead so nothing is lost.
+    """
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, flush_ms: int = AUDIT_FLUSH_MS,
+                 batch: int = AUDIT_BATCH, fallback_path: str = AUDIT_FALLBACK_PATH):
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.flush_ms, self.batch, self.fallback_path = flush_ms, batch, fallback_path
+        self._write_lock = threading.Lock()
+        # stats and the fallback file are touched by sessions, the writer thread and close() at exit;
+        # held only around those, never across a DB write, so a full-queue submit does not wait on one
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {"enqueued": 0, "written": 0, "batches": 0, "fallback": 0,
+                      "last_flush_ms": None, "max_flush_ms": 0.0}
+
+    def submit(self, entry: dict):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(entry)
+            with self._lock:
+                self.stats["enqueued"] += 1
+        except queue.Full:
+            self._fallback([entry])
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                return
+            batch, stop = [first], False
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while len(batch) < self.batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: list[dict]):
+        from database import SessionLocal
+        from models import AuditLog
+        t0 = time.perf_counter()
+        with self._write_lock:
+            try:
+                with SessionLocal() as db:
+                    db.execute(insert(AuditLog), batch)
+                    db.commit()
+                with self._lock:
+                    self.stats["written"] += len(batch)
+                    self.stats["batches"] += 1
+            except Exception:
+                self._fallback(batch)
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.stats["last_flush_ms"] = round(ms, 3)
+            self.stats["max_flush_ms"] = round(max(self.stats["max_flush_ms"], ms), 3)
+
+    def _fallback(self, batch: list[dict]):
+        lines = "".join(json.dumps({**e, "timestamp": e["timestamp"].isoformat()}) + "\n" for e in batch)
+        os.makedirs(os.path.dirname(self.fallback_path) or ".", exist_ok=True)
+        with self._lock:
+            with open(self.fallback_path, "a") as f:
+                f.write(lines)
+            self.stats["fallback"] += len(batch)
+
+    def flush(self):
+        """Synchronously write everything still queued (not a batch the writer thread already holds)."""
+        batch = []
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def close(self, timeout: float = 10.0):
+        """At shutdown: let the writer thread write its in-flight batch and exit, then flush what is left."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(_STOP)  # blocks only while the writer drains a full queue
+            self._thread.join(timeout)
+        self.flush()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self.stats, "queue_depth": self.queue.qsize()}
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.close)
+
 def log_action(db: Session, user_id: int, action: str, meta: dict = None):
-    from models import AuditLog
-    entry = AuditLog(user_id=user_id, action=action, metadata=meta or {}, timestamp=datetime.utcnow())
-    db.add(entry)
-    db.commit()
+    # `db` is kept for call compatibility; the write happens off the request path
+    audit_writer.submit({"user_id": user_id, "action": action, "details": meta or {}, "timestamp": datetime.utcnow()})
@@ -0,0 +1,145 @@
+"""Batch ingestion of many wearable CSVs (e.g. a nightly export).
+
+CSV parsing, timestamp parsing and feature extraction run in a process pool;
+the parsed frames are handed to a few writer threads, each with its own DB
+session, that do the bulk inserts and feature-store updates. All files of a
+patient go to the same writer, in job (file name) order, so the merges into
+PatientFeatureDay and the alert state never race. A failing file is reported
+and skipped without affecting the others.
+
+    python batch_ingest.py exports/                 # files named <patient_id>.csv or <patient_id>_*.csv
+    python batch_ingest.py --manifest jobs.csv      # columns: patient_id,path
+"""
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import pandas as pd
+
+import feature_store
+import alerts
+from data_ingestion import normalize_columns, parse_timestamps, store_samples, compute_features
+from database import SessionLocal
+
+def jobs_from_dir(path: str) -> list[tuple[int, str]]:
+    jobs = []
+    for name in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(name)
+        head = stem.split("_", 1)[0]
+        if ext.lower() == ".csv" and head.isdigit():
+            jobs.append((int(head), os.path.join(path, name)))
+    return jobs
+
+def jobs_from_manifest(path: str) -> list[tuple[int, str]]:
+    with open(path, newline="") as f:
+        return [(int(r["patient_id"]), r["path"]) for r in csv.DictReader(f)]
+
+def parse_file(path: str):
+    """Worker-process stage: everything that doesn't touch the DB."""
+    df = normalize_columns(pd.read_csv(path))
+    return df, parse_timestamps(df["timestamp"]), compute_features(df)
+
+def write_file(patient_id: int, df: pd.DataFrame, ts: pd.Series) -> int:
+    with SessionLocal() as db:
+        rows = store_samples(db, df, patient_id, ts)
+        alerts.on_ingest(db, patient_id, feature_store.update(db, patient_id, df, ts))
+        db.commit()
+    return rows
+
+def ingest_batch(jobs: list[tuple[int, str]], workers: int | None = None, writers: int = 2, progress=None) -> dict:
+    """Ingest (patient_id, csv_path) jobs; returns a summary with per-file results and throughput.
+
+    `progress(done, total, result)` is called after each file finishes (or fails).
+    """
+    t0 = time.perf_counter()
+    results, lock = [], threading.Lock()
+    # files parsing, parsed or being written at once; bounds how many frames are held in memory
+    window = (workers or os.cpu_count() or 1) + writers * 2
+
+    def finish(result):
+        with lock:
+            results.append(result)
+            if progress:
+                progress(len(results), len(jobs), result)
+
+    def write(pid, path, df, ts, feats, parse_s):
+        try:
+            w0 = time.perf_counter()
+            rows = write_file(pid, df, ts)
+            finish({"patient_id": pid, "path": path, "rows": rows, "feats": feats,
+                    "parse_s": round(parse_s, 3), "write_s": round(time.perf_counter() - w0, 3)})
+        except Exception as e:
+            finish({"patient_id": pid, "path": path, "error": f"write failed: {e}"})
+
+    order: dict[int, deque] = {}  # patient -> its job indexes not yet handed to a writer, in job order
+    for i, (pid, _) in enumerate(jobs):
+        order.setdefault(pid, deque()).append(i)
+
+    with ExitStack() as stack:
+        parsers = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        # one thread per writer, so a patient's files are written sequentially in the order submitted
+        writer_pools = [stack.enter_context(ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"writer-{n}"))
+                        for n in range(writers)]
+        parsing, parsed, writing, queued = {}, {}, set(), iter(range(len(jobs)))
+        while True:
+            while len(parsing) + len(parsed) + len(writing) < window and (i := next(queued, None)) is not None:
+                parsing[parsers.submit(parse_file, jobs[i][1])] = (i, time.perf_counter())
+            if not parsing and not writing:
+                break
+            done, _ = wait(set(parsing) | writing, return_when=FIRST_COMPLETED)
+            writing -= done
+            for fut in [f for f in done if f in parsing]:
+                i, submitted = parsing.pop(fut)  # dropping the future releases its frame once written
+                try:
+                    parsed[i] = (*fut.result(), time.perf_counter() - submitted)
+                except Exception as e:
+                    parsed[i] = e
+                pid = jobs[i][0]
+                pending = order[pid]
+                while pending and pending[0] in parsed:  # earlier files of this patient are handed over first
+                    j = pending.popleft()
+                    result, path = parsed.pop(j), jobs[j][1]
+                    if isinstance(result, Exception):
+                        finish({"patient_id": pid, "path": path, "error": f"parse failed: {result}"})
+                    else:
+                        writing.add(writer_pools[pid % writers].submit(write, pid, path, *result))
+
+    elapsed = time.perf_counter() - t0
+    ok = [r for r in results if "error" not in r]
+    rows = sum(r["rows"] for r in ok)
+    return {
+        "files": len(jobs), "succeeded": len(ok), "failed": len(results) - len(ok), "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "files_per_sec": round(len(jobs) / elapsed, 2) if elapsed else None,
+        "results": results,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("directory", nargs="?", help="directory of <patient_id>[_*].csv files")
+    ap.add_argument("--manifest", help="CSV with patient_id,path columns")
+    ap.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    ap.add_argument("--writers", type=int, default=2, help="DB writer connections")
+    args = ap.parse_args(argv)
+    if not args.directory and not args.manifest:
+        ap.error("give a directory or --manifest")
+    jobs = jobs_from_manifest(args.manifest) if args.manifest else jobs_from_dir(args.directory)
+
+    def progress(done, total, r):
+        status = f"ERROR {r['error']}" if "error" in r else f"{r['rows']} rows"
+        print(f"[{done}/{total}] patient {r['patient_id']} {r['path']}: {status}", flush=True)
+
+    summary = ingest_batch(jobs, args.workers, args.writers, progress)
+    print(f"Ingested {summary['rows']} rows from {summary['succeeded']}/{summary['files']} files "
+          f"in {summary['seconds']}s ({summary['rows_per_sec']} rows/s, {summary['files_per_sec']} files/s); "
+          f"{summary['failed']} failed")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
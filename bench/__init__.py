@@ -0,0 +1 @@
+"""Benchmarks for the ingestion, feature and prediction hot paths. Run with `python -m bench`."""
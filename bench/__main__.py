@@ -0,0 +1,90 @@
+"""python -m bench [--sizes 1k,100k,1m] [--out results.json] [--baseline old.json --threshold 0.15]
+
+Runs against a throwaway SQLite database (unless DATABASE_URL is already set),
+writes results as JSON and, with --baseline, exits 1 if any metric regressed
+by more than --threshold (fractional) in its "worse" direction.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+def _rows(token: str) -> int:
+    token = token.strip().lower()
+    mult = {"k": 1000, "m": 1_000_000}.get(token[-1], 1)
+    return int(float(token.rstrip("km")) * mult)
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, cur in current["metrics"].items():
+        old = baseline.get("metrics", {}).get(name)
+        if not old or not old["value"]:
+            continue
+        change = (cur["value"] - old["value"]) / old["value"]
+        worse = change > threshold if cur["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(f"{name}: {old['value']:.4g} -> {cur['value']:.4g} {cur['unit']} ({change:+.1%})")
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1k,100k,1m", help="synthetic CSV sizes in rows")
+    ap.add_argument("--out", default=None, help="write results JSON here (default: bench_results_<ts>.json)")
+    ap.add_argument("--baseline", default=None, help="previous results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15, help="allowed fractional regression")
+    args = ap.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="dtc-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    from database import Base, engine, SessionLocal
+    from models import User, PatientProfile
+    from bench import run
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    for i in range(200):  # enough patients for the directory query to page
+        u = User(email=f"bench{i}@example.com", hashed_password="x", role="patient", full_name=f"Bench Patient {i}")
+        db.add(u); db.flush()
+        db.add(PatientProfile(user_id=u.id, demographics={}, medical_history=""))
+    db.commit()
+    patient_id = db.query(PatientProfile.id).first()[0]
+
+    metrics = {}
+    for rows in (_rows(s) for s in args.sizes.split(",")):
+        print(f"ingestion + features @ {rows} rows...", flush=True)
+        metrics.update(run.bench_ingestion(db, patient_id, rows))
+        metrics.update(run.bench_features(rows))
+    print("prediction...", flush=True)
+    metrics.update(run.bench_prediction())
+    print("inference engines...", flush=True)
+    metrics.update(run.bench_engines())
+    print("dashboard queries...", flush=True)
+    metrics.update(run.bench_queries(db, patient_id))
+    db.close()
+
+    result = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "database": os.environ["DATABASE_URL"]},
+        "metrics": {k: {"value": round(v, 4), "unit": u, "better": b} for k, (v, u, b) in metrics.items()},
+    }
+    out = args.out or f"bench_results_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    width = max(map(len, result["metrics"]))
+    for name, m in result["metrics"].items():
+        print(f"{name:<{width}}  {m['value']:>12.4g} {m['unit']}")
+    print(f"results written to {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Load generator for ingest_server.py.
+
+    python -m bench.ingest_load --spawn --seconds 10 --concurrency 16 --batch 200
+    python -m bench.ingest_load --url http://127.0.0.1:8765 --patients 1,2,3 --format binary
+
+Each of --concurrency connections posts --batch samples (1 Hz, continuing its
+patient's timeline) as fast as the server acknowledges them, optionally capped
+by --rate batches/s per connection. Because the server answers after commit,
+request latency is end-to-end (send -> durable). --spawn starts a server on a
+throwaway SQLite database with --patients patients and stops it afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+import numpy as np
+
+def make_batch(fmt: str, n: int, start: float, rng) -> bytes:
+    cols = {"accel_x": rng.normal(0, 0.3, n), "accel_y": rng.normal(0, 0.3, n), "accel_z": rng.normal(1.0, 0.3, n),
+            "emg": np.abs(rng.normal(0.5, 0.3, n)), "spo2": np.clip(rng.normal(97, 1, n), 85, 100),
+            "hr": rng.normal(85, 12, n), "step_count": np.cumsum(rng.random(n) < 0.8)}
+    ts = start + np.arange(n, dtype=np.float64)
+    if fmt == "binary":
+        from ingest_server import BINARY_DTYPE
+        rec = np.empty(n, dtype=BINARY_DTYPE)
+        rec["timestamp"] = ts
+        for k, v in cols.items():
+            rec[k] = v
+        return rec.tobytes()
+    stamps = np.datetime_as_string((ts * 1e6).astype("datetime64[us]"), unit="s")
+    lines = (json.dumps({"timestamp": t + "Z", **{k: round(float(v[i]), 3) for k, v in cols.items()}})
+             for i, t in enumerate(stamps))
+    return ("\n".join(lines) + "\n").encode()
+
+async def _request(reader, writer, method: str, path: str, body: bytes = b"", ctype: str = "") -> tuple[int, bytes]:
+    head = f"{method} {path} HTTP/1.1\r\nHost: ingest\r\nContent-Length: {len(body)}\r\n"
+    if ctype:
+        head += f"Content-Type: {ctype}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    status_head = await reader.readuntil(b"\r\n\r\n")
+    lines = status_head.decode("latin-1").split("\r\n")
+    length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length"))
+    return int(lines[0].split()[1]), await reader.readexactly(length)
+
+async def _client(host, port, patient_id, fmt, batch, deadline, rate, seed, out):
+    rng = np.random.default_rng(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    ctype = "application/octet-stream" if fmt == "binary" else "application/x-ndjson"
+    start = 1.75e9 + seed * 1e7  # each connection gets its own stretch of timeline
+    interval = 1 / rate if rate else 0
+    try:
+        while time.perf_counter() < deadline:
+            body = make_batch(fmt, batch, start, rng)
+            t0 = time.perf_counter()
+            status, _ = await _request(reader, writer, "POST", f"/patients/{patient_id}/samples", body, ctype)
+            ms = (time.perf_counter() - t0) * 1000
+            if status == 200:
+                out["latency_ms"].append(ms)
+                out["rows"] += batch
+                start += batch
+            else:
+                out["status"][status] = out["status"].get(status, 0) + 1
+                if status == 503:
+                    await asyncio.sleep(1)
+            if interval:
+                await asyncio.sleep(max(0.0, interval - ms / 1000))
+    finally:
+        writer.close()
+
+async def run_load(url: str, patients: list[int], concurrency: int, batch: int, seconds: float,
+                   fmt: str = "ndjson", rate: float = 0) -> dict:
+    u = urlparse(url)
+    out = {"latency_ms": [], "rows": 0, "status": {}}
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    await asyncio.gather(*(_client(u.hostname, u.port, patients[i % len(patients)], fmt, batch, deadline, rate, i, out)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(out["latency_ms"]) if out["latency_ms"] else np.array([np.nan])
+    reader, writer = await asyncio.open_connection(u.hostname, u.port)
+    _, health = await _request(reader, writer, "GET", "/health")
+    writer.close()
+    return {"rows": out["rows"], "seconds": round(elapsed, 2), "rows_per_sec": round(out["rows"] / elapsed, 1),
+            "requests": len(out["latency_ms"]), "errors": out["status"],
+            "latency_p50_ms": round(float(np.percentile(lat, 50)), 2),
+            "latency_p99_ms": round(float(np.percentile(lat, 99)), 2),
+            "server": json.loads(health)}
+
+def _spawn(patients: int, port: int):
+    """Server subprocess on a fresh SQLite DB with `patients` patient profiles; returns (proc, patient_ids)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='dtc-ingest-'), 'ingest.db')}"}
+    seed = ("from database import Base, engine, SessionLocal\nfrom models import User, PatientProfile\n"
+            "Base.metadata.create_all(bind=engine)\ndb = SessionLocal()\n"
+            f"for i in range({patients}):\n"
+            "    u = User(email=f'load{i}@example.com', hashed_password='x', role='patient'); db.add(u); db.flush()\n"
+            "    db.add(PatientProfile(user_id=u.id, demographics={}, medical_history=''))\n"
+            "db.commit()\nprint(' '.join(str(p) for p, in db.query(PatientProfile.id)))\n")
+    ids = subprocess.run([sys.executable, "-c", seed], cwd=root, env=env, capture_output=True, text=True,
+                         check=True).stdout.split()
+    proc = subprocess.Popen([sys.executable, "ingest_server.py", "--port", str(port)], cwd=root, env=env,
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # "listening on ..."
+    return proc, [int(i) for i in ids]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--spawn", action="store_true", help="start a throwaway server for the run")
+    ap.add_argument("--patients", default="4", help="count with --spawn, else comma-separated patient ids")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--batch", type=int, default=200, help="samples per request")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--rate", type=float, default=0, help="max requests/s per connection (0 = unthrottled)")
+    ap.add_argument("--format", choices=["ndjson", "binary"], default="ndjson")
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        proc, patients = _spawn(int(args.patients), urlparse(args.url).port)
+    else:
+        patients = [int(p) for p in args.patients.split(",")]
+    try:
+        result = asyncio.run(run_load(args.url, patients, args.concurrency, args.batch, args.seconds,
+                                      args.format, args.rate))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
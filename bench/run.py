@@ -0,0 +1,104 @@
+"""Benchmark cases. Each returns {metric_name: (value, unit, better)} with better in {"lower", "higher"}."""
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+
+from bench.synthetic import wearable_csv, wearable_frame
+
+def _label(rows: int) -> str:
+    return f"{rows // 1_000_000}m" if rows >= 1_000_000 else f"{rows // 1000}k"
+
+def _latencies(fn, repeat: int) -> np.ndarray:
+    out = np.empty(repeat)
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - t0
+    return out * 1000
+
+def _pcts(name: str, ms: np.ndarray) -> dict:
+    return {f"{name}.p50_ms": (float(np.percentile(ms, 50)), "ms", "lower"),
+            f"{name}.p99_ms": (float(np.percentile(ms, 99)), "ms", "lower")}
+
+def bench_ingestion(db, patient_id: int, rows: int) -> dict:
+    from data_ingestion import parse_and_store, parse_and_store_stream
+    data = wearable_csv(rows)
+    _, _, stats = parse_and_store(data, patient_id, db)
+    _, _, stream_stats = parse_and_store_stream(data, patient_id, db)
+    tag = _label(rows)
+    return {f"ingest.bulk.{tag}.rows_per_sec": (stats["rows_per_sec"], "rows/s", "higher"),
+            f"ingest.stream.{tag}.rows_per_sec": (stream_stats["rows_per_sec"], "rows/s", "higher")}
+
+def bench_features(rows: int) -> dict:
+    from data_ingestion import compute_features
+    from features import FeatureAccumulator
+    from signal_features import window_features
+    df = wearable_frame(rows)
+    ts = np.datetime64("2025-01-01") + np.arange(rows) * np.timedelta64(1, "s")
+    arrays = {c: df[c].to_numpy() for c in df.columns}
+    arrays["timestamp"] = ts
+    tag = _label(rows)
+    out = {}
+    t0 = time.perf_counter(); compute_features(df); out[f"features.global.{tag}.ms"] = ((time.perf_counter() - t0) * 1000, "ms", "lower")
+    t0 = time.perf_counter(); FeatureAccumulator().update(df); out[f"features.accumulator.{tag}.ms"] = ((time.perf_counter() - t0) * 1000, "ms", "lower")
+    t0 = time.perf_counter(); window_features(arrays); out[f"features.windows.{tag}.ms"] = ((time.perf_counter() - t0) * 1000, "ms", "lower")
+    return out
+
+def bench_prediction(repeat: int = 500, batch: int = 1024) -> dict:
+    from models.model import TwinModel
+    model = TwinModel().warm_up()
+    feats = {"acc_mag_mean": 1.1, "acc_mag_std": 0.3, "emg_rms": 0.55, "hr_mean": 85, "spo2_mean": 97, "cadence_est": 60}
+    out = _pcts("predict.single", _latencies(lambda: model.predict(1, {"extra_minutes_balance": 10}, feats), repeat))
+    pairs = [(feats, {"extra_minutes_balance": i % 31}) for i in range(batch)]
+    out.update(_pcts(f"predict.batch{batch}", _latencies(lambda: model.predict_batch(pairs), max(10, repeat // 10))))
+    out.update(_pcts("predict.uncertainty.k1000", _latencies(lambda: model.predict_uncertainty(feats, [10]), max(10, repeat // 10))))
+    out.update(_pcts("predict.uncertainty.k1000x31", _latencies(lambda: model.predict_uncertainty(feats, range(31)), 20)))
+    return out
+
+# peak RSS of a fresh worker that loads one engine and serves a prediction
+# (VmHWM rather than ru_maxrss: the latter is inherited from this already-large process across fork/exec)
+_RSS_SCRIPT = """
+import resource
+from models import {mod} as engine
+engine.predict({{}}, weights_path={path!r})
+try:
+    print(next(l.split()[1] for l in open("/proc/self/status") if l.startswith("VmHWM:")))
+except OSError:
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def _worker_rss_mb(mod: str, path: str) -> float:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", _RSS_SCRIPT.format(mod=mod, path=path)], cwd=root,
+                         capture_output=True, text=True, check=True).stdout
+    return int(out.split()[-1]) / 1024  # KiB
+
+def bench_engines(repeat: int = 2000, batch: int = 1024) -> dict:
+    """numpy vs torch inference engine: single-row and batch latency, worker RSS."""
+    from models import numpy_model, torch_model
+    from models.features import FEATURES
+    if not os.path.exists(numpy_model.ARTIFACT):
+        numpy_model.export()
+    numpy_model.verify()
+    feats = {"acc_mag_mean": 1.1, "acc_mag_std": 0.3, "emg_rms": 0.55, "hr_mean": 85, "spo2_mean": 97,
+             "cadence_est": 60, "extra_minutes_balance": 10}
+    x = np.tile(np.array([[feats[k] for k in FEATURES]], dtype=np.float32), (batch, 1))
+    out = {}
+    for name, mod, path in (("numpy", numpy_model, numpy_model.ARTIFACT), ("torch", torch_model, numpy_model.WEIGHTS)):
+        mod.get_model(path)
+        out.update(_pcts(f"engine.{name}.single", _latencies(lambda: mod.predict(feats, weights_path=path), repeat)))
+        out.update(_pcts(f"engine.{name}.batch{batch}", _latencies(lambda: mod.predict_batch(x, weights_path=path), repeat // 10)))
+        out[f"engine.{name}.worker_rss_mb"] = (_worker_rss_mb(mod.__name__.split(".")[-1], path), "MB", "lower")
+    return out
+
+def bench_queries(db, patient_id: int, repeat: int = 50) -> dict:
+    import patient_directory
+    from timeseries import progress_series
+    def directory():
+        patient_directory.invalidate()
+        patient_directory.list_patients(db, "", 0)
+    out = _pcts("query.patient_directory", _latencies(directory, repeat))
+    out.update(_pcts("query.progress_series", _latencies(lambda: progress_series(db, patient_id, "hr"), repeat)))
+    return out
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+def wearable_frame(rows: int, seed: int = 0, freq: str = "1s") -> pd.DataFrame:
+    """Synthetic samples with the same columns and value ranges as sample_data/wearable_demo.csv."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range("2025-01-01", periods=rows, freq=freq)
+    return pd.DataFrame({
+        "timestamp": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "accel_x": rng.normal(0, 0.3, rows).round(3),
+        "accel_y": rng.normal(0, 0.3, rows).round(3),
+        "accel_z": rng.normal(1.0, 0.3, rows).round(3),
+        "emg": np.abs(rng.normal(0.5, 0.3, rows)).round(3),
+        "spo2": np.clip(rng.normal(97, 1, rows), 85, 100).round(1),
+        "hr": rng.normal(85, 12, rows).round(1),
+        "step_count": np.cumsum(rng.random(rows) < 0.8),
+    })
+
+def wearable_csv(rows: int, seed: int = 0) -> bytes:
+    return wearable_frame(rows, seed).to_csv(index=False).encode()
@@ -0,0 +1,247 @@
+"""Retention and downsampling for raw wearable rows in sensor_streams.
+
+    python compaction.py                                  # roll up rows older than COMPACT_AFTER_DAYS
+    python compaction.py --older-than 7 --resolution hour
+    python compaction.py --vacuum full                    # one-off: switch SQLite to incremental auto_vacuum
+
+Raw `wearable_csv` rows older than the cutoff are aggregated into one row per
+minute (or hour) with sensor_type `minute_summary` / `hour_summary` and the
+daily_summary payload shape (accel_mean, emg, hr, spo2, step_count, plus the
+sample count), then deleted. Work is done one patient and one time window at
+a time, and within a window COMPACT_BATCH raw rows per transaction: each
+batch's rollup merge and the deletes of exactly those raw rows commit
+together, so the write lock is held for one bounded batch and an interrupted
+run never counts a raw row twice on resume. Raw rows for an already rolled-up
+bucket (a later batch, or late arrivals) are merged into the existing
+aggregate (weighted by sample count).
+Progress is checkpointed to COMPACT_CHECKPOINT so a restarted run skips the
+patients it already finished for the same cutoff.
+
+Afterwards SQLite is shrunk with PRAGMA incremental_vacuum in bounded steps
+and ANALYZEd (Postgres: VACUUM ANALYZE). Bytes reclaimed are reported from
+page_count * page_size (pg_total_relation_size on Postgres).
+"""
+import argparse
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine
+from models import PatientProfile, SensorStream
+
+AFTER_DAYS = float(os.getenv("COMPACT_AFTER_DAYS", "30"))
+RESOLUTION = os.getenv("COMPACT_RESOLUTION", "minute")
+BATCH = int(os.getenv("COMPACT_BATCH", "10000"))  # raw rows rolled up and deleted per transaction
+DELETE_BATCH = int(os.getenv("COMPACT_DELETE_BATCH", "1000"))  # ids per DELETE ... IN (...)
+VACUUM_PAGES = int(os.getenv("COMPACT_VACUUM_PAGES", "2000"))  # pages freed per incremental_vacuum step
+CHECKPOINT = os.getenv("COMPACT_CHECKPOINT", os.path.join("data", "compaction_checkpoint.json"))
+
+# rollup bucket -> (sensor_type, bucket length, window processed per transaction)
+RESOLUTIONS = {"minute": ("minute_summary", timedelta(minutes=1), timedelta(hours=1)),
+               "hour": ("hour_summary", timedelta(hours=1), timedelta(days=1))}
+ROLLUP_TYPES = [t for t, _, _ in RESOLUTIONS.values()]
+
+def _floor(ts: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    return epoch + step * ((ts - epoch) // step)
+
+def rollup(rows: list[tuple], bucket: timedelta) -> pd.DataFrame:
+    """Aggregate (timestamp, payload) raw rows into one daily_summary-shaped record per bucket."""
+    ts = pd.DatetimeIndex([r[0] for r in rows])
+    payloads = [r[1] or {} for r in rows]
+    accel = np.array([p.get("accel") or [np.nan] * 3 for p in payloads], dtype=float)
+    df = pd.DataFrame({
+        "bucket": ts.floor(pd.Timedelta(bucket)),
+        "accel_mean": np.sqrt((accel ** 2).sum(axis=1)),
+        **{k: np.array([p.get(k, np.nan) for p in payloads], dtype=float) for k in ("emg", "hr", "spo2", "step_count")},
+    })
+    g = df.groupby("bucket", sort=True)
+    out = g[["accel_mean", "emg", "hr", "spo2"]].mean()
+    out["step_count"] = g["step_count"].max()  # cumulative counter, as in timeseries.WEARABLE_AGG
+    out["samples"] = g.size()
+    return out
+
+def _payload(rec) -> dict:
+    out = {k: (None if pd.isna(rec[k]) else round(float(rec[k]), 4)) for k in ("accel_mean", "emg", "hr", "spo2")}
+    out["step_count"] = None if pd.isna(rec["step_count"]) else int(rec["step_count"])
+    out["samples"] = int(rec["samples"])
+    return out
+
+def _merge(old: dict, new: dict) -> dict:
+    n_old, n_new = old.get("samples", 0), new["samples"]
+    merged = {"samples": n_old + n_new}
+    for k in ("accel_mean", "emg", "hr", "spo2"):
+        a, b = old.get(k), new.get(k)
+        merged[k] = b if a is None else a if b is None else round((a * n_old + b * n_new) / (n_old + n_new), 4)
+    merged["step_count"] = max((v for v in (old.get("step_count"), new.get("step_count")) if v is not None), default=None)
+    return merged
+
+def compact_window(db: Session, patient_id: int, start: datetime, end: datetime, sensor_type: str,
+                   bucket: timedelta) -> tuple[int, int]:
+    """Roll up and delete raw rows in [start, end), BATCH rows per transaction; returns (raw rows, rollup rows)."""
+    total, buckets = 0, set()
+    while True:
+        raw = db.query(SensorStream.id, SensorStream.timestamp, SensorStream.payload).filter(
+            SensorStream.patient_id == patient_id, SensorStream.sensor_type == "wearable_csv",
+            SensorStream.timestamp >= start, SensorStream.timestamp < end,
+        ).order_by(SensorStream.timestamp).limit(BATCH).all()
+        if not raw:
+            break
+        agg = rollup([(t, p) for _, t, p in raw], bucket)
+        # includes rollups written by earlier batches of this window, which this batch merges into
+        existing = {r.timestamp: r for r in db.query(SensorStream).filter(
+            SensorStream.patient_id == patient_id, SensorStream.sensor_type == sensor_type,
+            SensorStream.timestamp >= start, SensorStream.timestamp < end)}
+        new_rows = []
+        for ts, rec in agg.iterrows():
+            ts = ts.to_pydatetime()
+            payload = _payload(rec)
+            if ts in existing:
+                existing[ts].payload = _merge(existing[ts].payload or {}, payload)
+            else:
+                new_rows.append({"patient_id": patient_id, "timestamp": ts, "sensor_type": sensor_type, "payload": payload})
+        if new_rows:
+            db.execute(insert(SensorStream), new_rows)
+        ids = [i for i, _, _ in raw]
+        for i in range(0, len(ids), DELETE_BATCH):
+            db.query(SensorStream).filter(SensorStream.id.in_(ids[i:i + DELETE_BATCH])).delete(synchronize_session=False)
+        db.commit()  # the merge and the deletes of exactly these raw rows land together
+        total += len(raw)
+        buckets.update(agg.index)
+        if len(raw) < BATCH:
+            break
+    return total, len(buckets)
+
+def _next_raw(db: Session, patient_id: int, after: datetime | None, cutoff: datetime) -> datetime | None:
+    q = db.query(func.min(SensorStream.timestamp)).filter(
+        SensorStream.patient_id == patient_id, SensorStream.sensor_type == "wearable_csv",
+        SensorStream.timestamp < cutoff)
+    if after is not None:
+        q = q.filter(SensorStream.timestamp >= after)
+    return q.scalar()
+
+def compact_patient(db: Session, patient_id: int, cutoff: datetime, resolution: str = RESOLUTION,
+                    pause_s: float = 0.0) -> dict:
+    sensor_type, bucket, window = RESOLUTIONS[resolution]
+    cutoff = _floor(cutoff, bucket)  # never split a bucket at the cutoff
+    stats = {"raw_rows": 0, "rollup_rows": 0, "windows": 0}
+    nxt = _next_raw(db, patient_id, None, cutoff)
+    while nxt is not None:
+        start = _floor(nxt, window)
+        end = min(start + window, cutoff)
+        raw, rolled = compact_window(db, patient_id, start, end, sensor_type, bucket)
+        stats["raw_rows"] += raw
+        stats["rollup_rows"] += rolled
+        stats["windows"] += 1
+        if pause_s:
+            time.sleep(pause_s)  # let online writers in between windows
+        nxt = _next_raw(db, patient_id, end, cutoff)  # jumps over gaps via the index
+    return stats
+
+# -------------------- Storage --------------------
+def storage_bytes() -> dict:
+    """{"file": bytes allocated, "free": bytes on the freelist} (SQLite) or {"file": table bytes} (Postgres)."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            return {"file": pages * page_size, "free": free * page_size}
+        if engine.dialect.name == "postgresql":
+            return {"file": conn.execute(text("SELECT pg_total_relation_size('sensor_streams')")).scalar(), "free": 0}
+    return {"file": 0, "free": 0}
+
+def vacuum(mode: str = "incremental", pages: int = VACUUM_PAGES) -> str:
+    """Return freed pages to the OS and refresh planner statistics; returns what was done."""
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM FULL ANALYZE sensor_streams" if mode == "full" else "VACUUM ANALYZE sensor_streams"))
+        return f"postgres vacuum ({mode})"
+    if engine.dialect.name != "sqlite":
+        return "skipped"
+    with engine.connect() as conn:
+        auto = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if mode == "full":
+            # blocking rewrite; also switches an existing file to incremental auto_vacuum for later runs
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+            done = "full VACUUM (auto_vacuum now incremental)"
+        elif auto == 2:
+            steps = 0
+            while conn.exec_driver_sql("PRAGMA freelist_count").scalar():
+                # executescript steps the pragma to completion; a plain execute frees a single page
+                conn.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({pages});")
+                steps += 1
+            done = f"incremental_vacuum in {steps} step(s) of {pages} pages"
+        else:
+            done = "freed pages kept for reuse (file predates incremental auto_vacuum; run once with --vacuum full)"
+        conn.exec_driver_sql("ANALYZE sensor_streams")
+        conn.commit()
+    return done
+
+# -------------------- Checkpoint --------------------
+def _load_checkpoint(cutoff: datetime, resolution: str) -> dict:
+    try:
+        with open(CHECKPOINT) as f:
+            cp = json.load(f)
+        if cp.get("cutoff") == cutoff.isoformat() and cp.get("resolution") == resolution:
+            return cp
+    except (OSError, ValueError):
+        pass
+    return {"cutoff": cutoff.isoformat(), "resolution": resolution, "last_patient_id": 0,
+            "raw_rows": 0, "rollup_rows": 0}
+
+def _save_checkpoint(cp: dict):
+    os.makedirs(os.path.dirname(CHECKPOINT) or ".", exist_ok=True)
+    tmp = CHECKPOINT + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cp, f)
+    os.replace(tmp, CHECKPOINT)
+
+def run(older_than_days: float = AFTER_DAYS, resolution: str = RESOLUTION, vacuum_mode: str = "incremental",
+        pause_s: float = 0.0, now: datetime | None = None, progress=print) -> dict:
+    # the cutoff is day-aligned so a restart on the same day resumes the same run
+    cutoff = _floor((now or datetime.utcnow()) - timedelta(days=older_than_days), timedelta(days=1))
+    cp = _load_checkpoint(cutoff, resolution)
+    before = storage_bytes()
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        ids = [p for p, in db.query(PatientProfile.id).filter(
+            PatientProfile.id > cp["last_patient_id"]).order_by(PatientProfile.id)]
+        for pid in ids:
+            stats = compact_patient(db, pid, cutoff, resolution, pause_s)
+            cp["raw_rows"] += stats["raw_rows"]
+            cp["rollup_rows"] += stats["rollup_rows"]
+            cp["last_patient_id"] = pid
+            _save_checkpoint(cp)
+            if stats["raw_rows"] and progress:
+                progress(f"patient {pid}: {stats['raw_rows']} raw rows -> {stats['rollup_rows']} {resolution} rollups")
+    vacuumed = vacuum(vacuum_mode) if vacuum_mode != "none" else "skipped"
+    after = storage_bytes()
+    cp["completed_at"] = datetime.utcnow().isoformat()
+    _save_checkpoint(cp)
+    return {"cutoff": cutoff.isoformat(), "resolution": resolution, "raw_rows_deleted": cp["raw_rows"],
+            "rollup_rows": cp["rollup_rows"], "seconds": round(time.perf_counter() - t0, 2), "vacuum": vacuumed,
+            "bytes_before": before["file"], "bytes_after": after["file"],
+            "bytes_reclaimed": before["file"] - after["file"], "bytes_free_in_file": after["free"]}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--older-than", type=float, default=AFTER_DAYS, help="days of raw data to keep")
+    ap.add_argument("--resolution", choices=sorted(RESOLUTIONS), default=RESOLUTION)
+    ap.add_argument("--vacuum", choices=["incremental", "full", "none"], default="incremental")
+    ap.add_argument("--pause-ms", type=float, default=0, help="sleep between windows to yield to online writers")
+    args = ap.parse_args(argv)
+    result = run(args.older_than, args.resolution, args.vacuum, args.pause_ms / 1000)
+    print(json.dumps(result, indent=2))
+    mb = result["bytes_reclaimed"] / 2**20
+    print(f"reclaimed {mb:.1f} MB" if not math.isclose(mb, 0) else "no space returned to the OS")
+
+if __name__ == "__main__":
+    main()
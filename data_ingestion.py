@@ -1,47 +1,80 @@
+import time
+import warnings
 import pandas as pd
 import numpy as np
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models import SensorStream
+from sensor_blocks import STORAGE_MODE, store_blocks
+from features import FeatureAccumulator
+import feature_store
+import alerts
 from datetime import datetime
+from util.perf import timed
 
 EXPECTED_COLS = ["timestamp","accel_x","accel_y","accel_z","emg","spo2","hr","step_count"]
+INSERT_CHUNK = 5000  # rows per executemany batch
+STREAM_CHUNK = 50_000  # csv rows held in memory at once by the streaming path
 
-def parse_and_store(csv_bytes: bytes, patient_id: int, db: Session):
-    df = pd.read_csv(pd.io.common.BytesIO(csv_bytes))
-    # basic normalization
-    cols = [c.strip().lower() for c in df.columns]
-    df.columns = cols
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [c.strip().lower() for c in df.columns]
     missing = [c for c in EXPECTED_COLS if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required columns: {missing}. Expected {EXPECTED_COLS}")
+    return df
 
-    # store raw rows as sensor_stream entries (chunked for speed)
-    preview_rows = 0
-    for _, row in df.iterrows():
-        payload = {
-            "accel": [float(row["accel_x"]), float(row["accel_y"]), float(row["accel_z"])],
-            "emg": float(row["emg"]),
-            "spo2": float(row["spo2"]),
-            "hr": float(row["hr"]),
-            "step_count": float(row["step_count"]),
-        }
-        ts = None
-        try:
-            ts = pd.to_datetime(row["timestamp"]).to_pydatetime()
-        except Exception:
-            ts = datetime.utcnow()
-        s = SensorStream(patient_id=patient_id, timestamp=ts, sensor_type="wearable_csv", payload=payload)
-        db.add(s)
-        preview_rows += 1
-        if preview_rows >= 2000:  # avoid giant inserts on demo
-            break
-    db.commit()
+def parse_timestamps(col: pd.Series, fill_missing: bool = True) -> pd.Series:
+    # one vectorized parse per column; unparseable values fall back to ingest time (naive UTC),
+    # or stay NaT with fill_missing=False
+    ts = pd.to_datetime(col, errors="coerce", utc=True, format="ISO8601")
+    retry = ts.isna() & col.notna()
+    if retry.any():  # non-ISO stragglers get pandas' per-element inference
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            ts[retry] = pd.to_datetime(col[retry], errors="coerce", utc=True)
+    ts = ts.dt.tz_localize(None)
+    return ts.fillna(pd.Timestamp(datetime.utcnow())) if fill_missing else ts
+
+def json_values(values) -> list:
+    """Floats as JSON-safe Python values: NaN/inf (e.g. blank CSV cells) become None, since a bare NaN token
+    is not valid JSON and breaks json_extract over the payloads."""
+    values = np.asarray(values, dtype=float)
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+def build_rows(df: pd.DataFrame, patient_id: int, ts: pd.Series | None = None) -> list[dict]:
+    accel = json_values(df[["accel_x","accel_y","accel_z"]].to_numpy(dtype=float))
+    emg = json_values(df["emg"])
+    spo2 = json_values(df["spo2"])
+    hr = json_values(df["hr"])
+    steps = json_values(df["step_count"])
+    if ts is None:
+        ts = parse_timestamps(df["timestamp"])
+    ts = list(ts.dt.to_pydatetime())
+    return [
+        {"patient_id": patient_id, "timestamp": t, "sensor_type": "wearable_csv",
+         "payload": {"accel": a, "emg": e, "spo2": s, "hr": h, "step_count": c}}
+        for t, a, e, s, h, c in zip(ts, accel, emg, spo2, hr, steps)
+    ]
 
-    # feature engineering
+def bulk_insert(db: Session, rows: list[dict], chunk: int = INSERT_CHUNK) -> int:
+    for i in range(0, len(rows), chunk):
+        db.execute(insert(SensorStream), rows[i:i + chunk])
+    return len(rows)
+
+def store_samples(db: Session, df: pd.DataFrame, patient_id: int, ts: pd.Series | None = None) -> int:
+    if ts is None:
+        ts = parse_timestamps(df["timestamp"])
+    if STORAGE_MODE == "blocks":
+        return store_blocks(db, df, ts, patient_id)
+    return bulk_insert(db, build_rows(df, patient_id, ts))
+
+def compute_features(df: pd.DataFrame) -> dict:
     acc_mag = np.sqrt(df["accel_x"]**2 + df["accel_y"]**2 + df["accel_z"]**2)
     emg_rms = np.sqrt(np.mean(np.square(df["emg"])))
     cadence_est = (df["step_count"].diff().clip(lower=0).fillna(0).mean()) * 60  # steps/min
-    feats = {
+    return {
         "acc_mag_mean": float(acc_mag.mean()),
         "acc_mag_std": float(acc_mag.std()),
         "emg_rms": float(emg_rms),
@@ -49,4 +82,47 @@ def parse_and_store(csv_bytes: bytes, patient_id: int, db: Session):
         "spo2_mean": float(df["spo2"].mean()),
         "cadence_est": float(cadence_est),
     }
-    return df.head(10), feats
+
+@timed("parse_and_store")
+def parse_and_store(csv_bytes: bytes, patient_id: int, db: Session):
+    t0 = time.perf_counter()
+    df = normalize_columns(pd.read_csv(pd.io.common.BytesIO(csv_bytes)))
+
+    # store raw samples as bulk-inserted sensor_stream rows or columnar blocks
+    ts = parse_timestamps(df["timestamp"])
+    rows = store_samples(db, df, patient_id, ts)
+    days = feature_store.update(db, patient_id, df, ts)
+    alerts.on_ingest(db, patient_id, days)
+    db.commit()
+
+    feats = compute_features(df)
+    elapsed = time.perf_counter() - t0
+    stats = {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rows / elapsed, 1) if elapsed else None}
+    return df.head(10), feats, stats
+
+@timed("parse_and_store_stream")
+def parse_and_store_stream(source, patient_id: int, db: Session, chunksize: int = STREAM_CHUNK):
+    """Streaming variant of parse_and_store: reads `source` (path, file object or bytes)
+    `chunksize` rows at a time so peak memory does not grow with the upload size."""
+    t0 = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        source = pd.io.common.BytesIO(source)
+    acc = FeatureAccumulator()
+    head, rows, days = None, 0, set()
+    with pd.read_csv(source, chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk = normalize_columns(chunk)
+            if head is None:
+                head = chunk.head(10)
+            ts = parse_timestamps(chunk["timestamp"])
+            rows += store_samples(db, chunk, patient_id, ts)
+            days.update(feature_store.update(db, patient_id, chunk, ts))
+            acc.update(chunk)
+    alerts.on_ingest(db, patient_id, sorted(days))
+    db.commit()
+
+    if head is None:
+        head = pd.DataFrame(columns=EXPECTED_COLS)
+    elapsed = time.perf_counter() - t0
+    stats = {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rows / elapsed, 1) if elapsed else None}
+    return head, acc.features(), stats
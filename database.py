@@ -1,19 +1,123 @@
+import math
 import os
-from sqlalchemy import create_engine
+import sqlite3
+import time
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from util.perf import instrument_engine
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/app.db")
 
+# Pool sizing (per process); Streamlit runs one script thread per active browser session
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
 connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
+pool_args = {"pool_pre_ping": POOL_PRE_PING}
+is_sqlite = DATABASE_URL.startswith("sqlite")
+if is_sqlite:
     os.makedirs("data", exist_ok=True)
-    connect_args = {"check_same_thread": False}
+    connect_args = {"check_same_thread": False, "timeout": POOL_TIMEOUT}
+if not is_sqlite or ":memory:" not in DATABASE_URL:
+    pool_args.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args, **pool_args)
+instrument_engine(engine)
+# expire_on_commit=False: ORM objects (e.g. the logged-in User) stay readable after their session closes
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
+if is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new file; lets compaction.py shrink it
+        cur.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+        cur.execute("PRAGMA synchronous=NORMAL")  # fsync at checkpoints only; safe with WAL
+        cur.execute(f"PRAGMA busy_timeout={int(POOL_TIMEOUT * 1000)}")
+        cur.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        cur.execute("PRAGMA temp_store=MEMORY")
+        try:
+            cur.execute("SELECT sqrt(1)")
+        except sqlite3.OperationalError:  # SQLite built without math functions (timeseries uses sqrt)
+            dbapi_conn.create_function("sqrt", 1, lambda v: None if v is None else math.sqrt(v), deterministic=True)
+        cur.close()
+
+# -------------------- Pool metrics --------------------
+_pool_lock = threading.Lock()
+_pool_stats = {"checkouts": 0, "checkins": 0, "connects": 0, "waits": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(*_):
+    with _pool_lock:
+        _pool_stats["checkouts"] += 1
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(*_):
+    with _pool_lock:
+        _pool_stats["checkins"] += 1
+
+@event.listens_for(engine, "connect")
+def _on_connect(*_):
+    with _pool_lock:
+        _pool_stats["connects"] += 1
+
+def _record_wait(ms: float):
+    with _pool_lock:
+        _pool_stats["waits"] += 1
+        _pool_stats["wait_ms_total"] += ms
+        _pool_stats["wait_ms_max"] = max(_pool_stats["wait_ms_max"], ms)
+
+def pool_metrics() -> dict:
+    pool = engine.pool
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    waits = stats.pop("waits")
+    stats["wait_ms_avg"] = round(stats.pop("wait_ms_total") / waits, 3) if waits else None
+    stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+    stats["pool"] = type(pool).__name__
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+@contextmanager
+def session_scope():
+    """One session per unit of work (e.g. a Streamlit rerun): rolled back on error, always closed.
+    Streamlit's st.stop/st.rerun raise BaseException subclasses; those only close the session."""
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    db.connection()  # check out eagerly so pool wait time is measured here
+    _record_wait((time.perf_counter() - t0) * 1000)
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def upgrade_schema():
+    """Additive schema changes that create_all() can't apply to databases created before them. Idempotent;
+    run after create_all()."""
+    from sqlalchemy import inspect, text
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        have = {c["name"] for c in insp.get_columns("predictions")}
+        for name in ("cache_key", "model_version"):  # prediction_cache
+            if name not in have:
+                conn.execute(text(f"ALTER TABLE predictions ADD COLUMN {name} VARCHAR"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_predictions_cache_key ON predictions (cache_key)"))
+        # range queries behind the progress charts (timeseries.py)
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sensor_streams_patient_type_ts "
+                          "ON sensor_streams (patient_id, sensor_type, timestamp)"))
+
 def get_db():
     db = SessionLocal()
     try:
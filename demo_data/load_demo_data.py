@@ -1,86 +1,215 @@
-import json, os, datetime
-from database import engine, SessionLocal, Base
+"""Load the demo fixtures, optionally scaled up to a synthetic cohort for load testing.
+
+    python demo_data/load_demo_data.py                                   # fixtures only
+    python demo_data/load_demo_data.py --patients 10000 --samples 2000   # 10k patients, 2k wearable rows each
+
+Every phase is a bulk insert in one transaction, refs are resolved through
+precomputed maps, and re-runs skip rows that already exist, so the loader is
+idempotent. Synthetic patient N is a jittered copy of fixture patient
+((N - 1) % fixture_count) + 1 with email patientN@example.com.
+"""
+import argparse, json, os, sys, datetime
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import insert
+from database import engine, SessionLocal, Base, upgrade_schema
 from models import User, PatientProfile, SensorStream, Prediction, AuditLog
-from passlib.context import CryptContext
+from util.auth import hash_password, hash_passwords
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+CHUNK = 5000
+
+def _fixture(name):
+    with open(os.path.join(BASE, name)) as f:
+        return json.load(f)
+
+def _bulk_insert(db, model, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.execute(insert(model), rows[i:i + CHUNK])
+    return len(rows)
+
+def _existing(db, key_cols, patient_col, ids):
+    """Set of key tuples already stored for the given owner ids (for idempotent re-runs)."""
+    keys = set()
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK):
+        keys.update(tuple(r) for r in db.query(*key_cols).filter(patient_col.in_(ids[i:i + CHUNK])))
+    return keys
+
+def _date(s):
+    return datetime.datetime.fromisoformat(s)
+
+# -------------------- Synthetic scaling --------------------
+def _jitter(value, rng):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    v = value * rng.normal(1.0, 0.05)
+    return int(round(v)) if isinstance(value, int) else round(float(v), 3)
 
-pwd = CryptContext(schemes=['bcrypt'], deprecated='auto')
+def scale_fixtures(patients: int | None, seed: int = 0):
+    """Fixture users/streams/predictions/audits, extended to `patients` patients."""
+    users, streams, preds, audits = _fixture('users.json'), _fixture('sensor_streams.json'), \
+        _fixture('predictions.json'), _fixture('audit_logs.json')
+    base = users['patients']
+    total = max(patients or len(base), len(base))
+    if total == len(base):
+        return users, streams, preds, audits
+    rng = np.random.default_rng(seed)
+    by_ref = lambda rows: {r: [x for x in rows if x['patient_ref'] == r] for r in range(1, len(base) + 1)}
+    stream_tpl, pred_tpl = by_ref(streams), by_ref(preds)
+    consent = [a for a in audits if isinstance(a['user_ref'], int)]
+    for ref in range(len(base) + 1, total + 1):
+        tpl_ref = (ref - 1) % len(base) + 1
+        tpl = base[tpl_ref - 1]
+        base.append({**tpl, 'email': f'patient{ref}@example.com', 'full_name': f"{tpl['full_name']} #{ref}",
+                     'age': _jitter(tpl['age'], rng), 'synthetic': True})
+        streams += [{**s, 'patient_ref': ref, 'payload': {k: _jitter(v, rng) for k, v in s['payload'].items()}}
+                    for s in stream_tpl[tpl_ref]]
+        preds += [{**p, 'patient_ref': ref, 'result': {k: _jitter(v, rng) for k, v in p['result'].items()}}
+                  for p in pred_tpl[tpl_ref]]
+        audits += [{**a, 'user_ref': ref} for a in consent if a['user_ref'] == tpl_ref]
+    return users, streams, preds, audits
 
-BASE = os.path.join(os.path.dirname(__file__), 'demo_data')
-def load_users():
+def synthetic_wearable(n: int, start: datetime.datetime, rng) -> pd.DataFrame:
+    ts = pd.date_range(start, periods=n, freq='1s')
+    return pd.DataFrame({
+        'timestamp': ts, 'accel_x': rng.normal(0, 0.3, n), 'accel_y': rng.normal(0, 0.3, n),
+        'accel_z': rng.normal(1.0, 0.3, n), 'emg': np.abs(rng.normal(0.5, 0.3, n)),
+        'spo2': np.clip(rng.normal(97, 1, n), 85, 100), 'hr': rng.normal(80, 10, n),
+        'step_count': np.cumsum(rng.random(n) < 0.8),
+    })
+
+# -------------------- Loaders --------------------
+def load_users(users=None):
+    """Upsert admin, clinician and patients (+ profiles). Returns {patient_ref: patient_profile_id}."""
+    users = users or _fixture('users.json')
+    people = [dict(users['admin'], role='admin'), dict(users['clinician'], role='clinician')] + \
+             [dict(p, role='patient') for p in users['patients']]
     db = SessionLocal()
-    with open(os.path.join(BASE,'users.json')) as f:
-        data = json.load(f)
-    # admin
-    admin = data['admin']
-    if not db.query(User).filter(User.email==admin['email']).first():
-        u = User(email=admin['email'], hashed_password=pwd.hash(admin['password']), full_name=admin['full_name'], role='admin')
-        db.add(u); db.commit(); db.refresh(u)
-    # clinician
-    cl = data['clinician']
-    if not db.query(User).filter(User.email==cl['email']).first():
-        u = User(email=cl['email'], hashed_password=pwd.hash(cl['password']), full_name=cl['full_name'], role='clinician')
-        db.add(u); db.commit(); db.refresh(u)
-    # patients
-    for p in data['patients']:
-        if not db.query(User).filter(User.email==p['email']).first():
-            u = User(email=p['email'], hashed_password=pwd.hash(p['password']), full_name=p['full_name'], role='patient')
-            db.add(u); db.commit(); db.refresh(u)
-            # create profile
-            prof = PatientProfile(user_id=u.id, demographics={'age': p['age'], 'sex': p['sex']}, medical_history=p['history'])
-            db.add(prof); db.commit()
+    existing = {e for e, in db.query(User.email)}
+    new = [p for p in people if p['email'] not in existing]
+    # fixture accounts get individually salted hashes (in parallel). Synthetic copies deliberately share one hash
+    # per password: they are load-test accounts with a published demo password, so a per-user salt protects
+    # nothing and would cost one bcrypt round per generated patient. Never use synthetic=true for real accounts.
+    individual = [p for p in new if not p.get('synthetic')]
+    hashes = dict(zip((p['email'] for p in individual), hash_passwords([p['password'] for p in individual])))
+    shared = {}
+    for p in new:
+        if p['email'] not in hashes:
+            if p['password'] not in shared:
+                shared[p['password']] = hash_password(p['password'])
+            hashes[p['email']] = shared[p['password']]
+    _bulk_insert(db, User, [{'email': p['email'], 'hashed_password': hashes[p['email']], 'full_name': p['full_name'],
+                             'role': p['role'], 'is_active': True} for p in new])
+
+    user_ids = dict(db.query(User.email, User.id).filter(User.role == 'patient'))
+    with_profile = {u for u, in db.query(PatientProfile.user_id)}
+    _bulk_insert(db, PatientProfile, [
+        {'user_id': user_ids[p['email']], 'demographics': {'age': p['age'], 'sex': p['sex']}, 'medical_history': p['history']}
+        for p in users['patients'] if user_ids[p['email']] not in with_profile])
+    db.commit()
+    profile_ids = dict(db.query(PatientProfile.user_id, PatientProfile.id))
+    refs = {i + 1: profile_ids[user_ids[p['email']]] for i, p in enumerate(users['patients'])}
     db.close()
+    return refs
 
-def load_streams():
+def load_streams(refs, streams=None):
+    streams = streams if streams is not None else _fixture('sensor_streams.json')
     db = SessionLocal()
-    with open(os.path.join(BASE,'sensor_streams.json')) as f:
-        streams = json.load(f)
-    # map patient_ref (1..n) to actual patient_profile ids by order of creation
-    patients = db.query(PatientProfile).all()
-    mapping = {i+1: patients[i].id for i in range(len(patients))}
+    seen = _existing(db, (SensorStream.patient_id, SensorStream.sensor_type, SensorStream.timestamp),
+                     SensorStream.patient_id, refs.values())
+    rows = []
     for s in streams:
-        pid = mapping.get(s['patient_ref'])
-        if not pid: continue
-        p = SensorStream(patient_id=pid, timestamp=datetime.datetime.fromisoformat(s['timestamp']), sensor_type=s['sensor_type'], payload=s['payload'])
-        db.add(p)
+        pid = refs.get(s['patient_ref'])
+        ts = _date(s['timestamp'])
+        if pid and (pid, s['sensor_type'], ts) not in seen:
+            rows.append({'patient_id': pid, 'timestamp': ts, 'sensor_type': s['sensor_type'], 'payload': s['payload']})
+    n = _bulk_insert(db, SensorStream, rows)
     db.commit(); db.close()
+    return n
 
-def load_predictions():
+def load_predictions(refs, preds=None):
+    preds = preds if preds is not None else _fixture('predictions.json')
     db = SessionLocal()
-    with open(os.path.join(BASE,'predictions.json')) as f:
-        preds = json.load(f)
-    patients = db.query(PatientProfile).all()
-    mapping = {i+1: patients[i].id for i in range(len(patients))}
+    seen = _existing(db, (Prediction.patient_id, Prediction.created_at, Prediction.model_version),
+                     Prediction.patient_id, refs.values())
+    rows = []
     for p in preds:
-        pid = mapping.get(p['patient_ref'])
-        if not pid: continue
-        pr = Prediction(patient_id=pid, created_at=datetime.datetime.fromisoformat(p['created_at']), model_version=p['model_version'], result=p['result'])
-        db.add(pr)
+        pid = refs.get(p['patient_ref'])
+        created = _date(p['created_at'])
+        if pid and (pid, created, p['model_version']) not in seen:
+            rows.append({'patient_id': pid, 'created_at': created, 'model_version': p['model_version'],
+                         'scenario': {}, 'result': p['result']})
+    n = _bulk_insert(db, Prediction, rows)
     db.commit(); db.close()
+    return n
 
-def load_audits():
+def load_audits(users=None, logs=None):
+    users = users or _fixture('users.json')
+    logs = logs if logs is not None else _fixture('audit_logs.json')
     db = SessionLocal()
-    with open(os.path.join(BASE,'audit_logs.json')) as f:
-        logs = json.load(f)
-    # create entries
+    user_ids = dict(db.query(User.email, User.id))
+    patient_emails = [p['email'] for p in users['patients']]
+    def resolve(ref):
+        # int refs are 1-based positions in the patient fixture list
+        email = patient_emails[ref - 1] if isinstance(ref, int) and 0 < ref <= len(patient_emails) else ref
+        return user_ids.get(email)
+    seen = _existing(db, (AuditLog.user_id, AuditLog.action, AuditLog.timestamp), AuditLog.user_id, user_ids.values())
+    rows = []
     for l in logs:
-        if isinstance(l['user_ref'], int):
-            # map to user by insertion order among patients
-            user = db.query(User).filter(User.role=='patient').all()[l['user_ref']-1]
-            uid = user.id
-        else:
-            user = db.query(User).filter(User.email==l['user_ref']).first()
-            uid = user.id if user else None
-        entry = AuditLog(user_id=uid, action=l['action'], metadata=l['metadata'], timestamp=datetime.datetime.fromisoformat(l['timestamp']))
-        db.add(entry)
+        uid = resolve(l['user_ref'])
+        ts = _date(l['timestamp'])
+        if uid and (uid, l['action'], ts) not in seen:
+            rows.append({'user_id': uid, 'action': l['action'], 'details': l['metadata'], 'timestamp': ts})
+            seen.add((uid, l['action'], ts))
+    n = _bulk_insert(db, AuditLog, rows)
     db.commit(); db.close()
+    return n
 
-if __name__ == '__main__':
+def load_wearables(refs, samples: int, seed: int = 0):
+    """`samples` seconds of synthetic wearable data per patient that has none yet, via the ingest path."""
+    import feature_store, alerts
+    from data_ingestion import store_samples
+    from compaction import ROLLUP_TYPES
+    rng = np.random.default_rng(seed)
+    db = SessionLocal()
+    has_data = {p for p, in db.query(SensorStream.patient_id).filter(
+        SensorStream.sensor_type.in_(['wearable_csv', *ROLLUP_TYPES])).distinct()}
+    total = 0
+    for pid in refs.values():
+        if pid in has_data:
+            continue
+        df = synthetic_wearable(samples, datetime.datetime(2025, 8, 1), rng)
+        total += store_samples(db, df, pid, df['timestamp'])
+        alerts.on_ingest(db, pid, feature_store.update(db, pid, df, df['timestamp']))
+        db.commit()
+    db.close()
+    return total
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--patients', type=int, default=None, help='scale the cohort up to this many patients')
+    ap.add_argument('--samples', type=int, default=0, help='synthetic wearable rows (1 Hz) per patient')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    users, streams, preds, audits = scale_fixtures(args.patients, args.seed)
     print('Loading demo users...')
-    load_users()
+    refs = load_users(users)
     print('Loading sensor streams...')
-    load_streams()
+    print(f'  {load_streams(refs, streams)} new rows')
     print('Loading predictions...')
-    load_predictions()
+    print(f'  {load_predictions(refs, preds)} new rows')
     print('Loading audit logs...')
-    load_audits()
+    print(f'  {load_audits(users, audits)} new rows')
+    if args.samples:
+        print('Generating wearable samples...')
+        print(f'  {load_wearables(refs, args.samples, args.seed)} new rows')
     print('Demo data loaded.')
+
+if __name__ == '__main__':
+    main()
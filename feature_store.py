@@ -0,0 +1,94 @@
+"""Incremental per-patient feature store.
+
+Each ingest folds its rows into one PatientFeatureDay row per (patient, day)
+holding mergeable sufficient statistics, so updates cost O(new rows) and any
+window's features are a merge over its day rows, never a rescan of
+sensor_streams. Days are merged in date order; uploads within a day are
+assumed to arrive chronologically.
+"""
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import PatientFeatureDay
+from features import FeatureAccumulator
+
+def update(db: Session, patient_id: int, df: pd.DataFrame, ts: pd.Series):
+    """Fold a parsed EXPECTED_COLS frame (with its parsed timestamps) into the store; returns the days touched.
+    Caller commits."""
+    if not len(df):
+        return []
+    days = ts.to_numpy().astype("datetime64[D]")
+    uniq, inverse = np.unique(days, return_inverse=True)
+    day_list = [d.item() for d in uniq]
+    existing = {r.day: r for r in db.query(PatientFeatureDay).filter(
+        PatientFeatureDay.patient_id == patient_id, PatientFeatureDay.day.in_(day_list))}
+    now = datetime.utcnow()
+    for i, day in enumerate(day_list):
+        acc = FeatureAccumulator()
+        acc.update(df[inverse == i])
+        row = existing.get(day)
+        if row is None:
+            db.add(PatientFeatureDay(patient_id=patient_id, day=day, stats=acc.to_state(), updated_at=now))
+        else:
+            row.stats = FeatureAccumulator.from_state(row.stats).merge(acc).to_state()
+            row.updated_at = now
+    db.flush()  # sessions don't autoflush; make new day rows visible to the next chunk's lookup
+    return day_list
+
+def window_features(db: Session, patient_id: int, start: date | None = None, end: date | None = None) -> dict | None:
+    """Model features for days in [start, end], or None if nothing was ingested there."""
+    q = db.query(PatientFeatureDay.stats).filter(PatientFeatureDay.patient_id == patient_id)
+    if start is not None:
+        q = q.filter(PatientFeatureDay.day >= start)
+    if end is not None:
+        q = q.filter(PatientFeatureDay.day <= end)
+    acc = None
+    for (stats,) in q.order_by(PatientFeatureDay.day):
+        day_acc = FeatureAccumulator.from_state(stats)
+        acc = day_acc if acc is None else acc.merge(day_acc)
+    return acc.features() if acc is not None and acc.rows else None
+
+def latest_features(db: Session, patient_id: int, days: int = 7) -> dict | None:
+    """Features over the `days` most recent days that have data for this patient."""
+    last = db.query(PatientFeatureDay.day).filter(
+        PatientFeatureDay.patient_id == patient_id).order_by(PatientFeatureDay.day.desc()).first()
+    if last is None:
+        return None
+    return window_features(db, patient_id, last.day - timedelta(days=days - 1), last.day)
+
+def feature_spread(db: Session, patient_id: int, days: int = 7) -> dict | None:
+    """Day-to-day standard deviation of each feature over the `days` most recent days with data
+    (the input noise TwinModel.predict_uncertainty perturbs with). Features with fewer than two finite
+    daily values are left out (the model falls back to a relative spread); None if that is all of them."""
+    rows = db.query(PatientFeatureDay.stats).filter(PatientFeatureDay.patient_id == patient_id).order_by(
+        PatientFeatureDay.day.desc()).limit(days).all()
+    daily = [FeatureAccumulator.from_state(stats).features() for stats, in rows]
+    spread = {}
+    for k in (daily[0] if daily else {}):
+        values = np.array([f.get(k, np.nan) for f in daily], dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) >= 2:
+            spread[k] = float(np.std(values, ddof=1))
+    return spread or None
+
+def cohort_features(db: Session, patient_ids: list[int], days: int = 7) -> dict[int, dict]:
+    """latest_features for a page of patients in two queries (last day per patient, then their day rows)."""
+    if not patient_ids:
+        return {}
+    last = dict(db.query(PatientFeatureDay.patient_id, func.max(PatientFeatureDay.day)).filter(
+        PatientFeatureDay.patient_id.in_(patient_ids)).group_by(PatientFeatureDay.patient_id))
+    if not last:
+        return {}
+    start = {pid: day - timedelta(days=days - 1) for pid, day in last.items()}
+    rows = db.query(PatientFeatureDay.patient_id, PatientFeatureDay.day, PatientFeatureDay.stats).filter(
+        PatientFeatureDay.patient_id.in_(list(last)), PatientFeatureDay.day >= min(start.values())).order_by(
+        PatientFeatureDay.patient_id, PatientFeatureDay.day)
+    accs: dict[int, FeatureAccumulator] = {}
+    for pid, day, stats in rows:
+        if day < start[pid]:
+            continue
+        day_acc = FeatureAccumulator.from_state(stats)
+        accs[pid] = accs[pid].merge(day_acc) if pid in accs else day_acc
+    return {pid: acc.features() for pid, acc in accs.items() if acc.rows}
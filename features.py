@@ -0,0 +1,111 @@
+"""Mergeable running statistics behind the TwinModel input features."""
+import numpy as np
+import pandas as pd
+
+class RunningMoments:
+    """Welford mean/variance that merges whole chunks (Chan et al.), skipping NaN like pandas."""
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n, self.mean, self.m2 = n, mean, m2
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        mean_b = float(values.mean())
+        self.merge(RunningMoments(len(values), mean_b, float(np.square(values - mean_b).sum())))
+
+    def merge(self, other: "RunningMoments"):
+        if not other.n:
+            return
+        n_b, mean_b, m2_b = other.n, other.mean, other.m2
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.n = n
+
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else float("nan")
+
+class FeatureAccumulator:
+    """Folds EXPECTED_COLS chunks into the same feats dict compute_features returns."""
+    def __init__(self):
+        self.acc_mag = RunningMoments()
+        self.hr = RunningMoments()
+        self.spo2 = RunningMoments()
+        self.emg_n, self.emg_sumsq = 0, 0.0
+        self.rows, self.step_diff_sum = 0, 0.0
+        self.first_step = self.last_step = float("nan")
+
+    def update(self, df: pd.DataFrame):
+        ax, ay, az = (df[c].to_numpy(dtype=float) for c in ("accel_x", "accel_y", "accel_z"))
+        self.acc_mag.update(np.sqrt(ax**2 + ay**2 + az**2))
+        self.hr.update(df["hr"].to_numpy(dtype=float))
+        self.spo2.update(df["spo2"].to_numpy(dtype=float))
+        emg = df["emg"].to_numpy(dtype=float)
+        emg = emg[~np.isnan(emg)]
+        self.emg_n += len(emg)
+        self.emg_sumsq += float(np.square(emg).sum())
+        # step diffs carry across chunk boundaries; the very first diff counts as 0
+        steps = df["step_count"].to_numpy(dtype=float)
+        if len(steps):
+            if not self.rows:
+                self.first_step = steps[0]
+            diffs = np.diff(steps, prepend=self.last_step)
+            self.step_diff_sum += float(np.nansum(np.clip(diffs, 0, None)))
+            self.rows += len(steps)
+            self.last_step = steps[-1]
+
+    def features(self) -> dict:
+        nan = float("nan")
+        return {
+            "acc_mag_mean": self.acc_mag.mean if self.acc_mag.n else nan,
+            "acc_mag_std": self.acc_mag.std(),
+            "emg_rms": float(np.sqrt(self.emg_sumsq / self.emg_n)) if self.emg_n else nan,
+            "hr_mean": self.hr.mean if self.hr.n else nan,
+            "spo2_mean": self.spo2.mean if self.spo2.n else nan,
+            "cadence_est": self.step_diff_sum / self.rows * 60 if self.rows else nan,  # steps/min
+        }
+
+    def merge(self, later: "FeatureAccumulator"):
+        """Fold in an accumulator covering samples that come after this one's."""
+        self.acc_mag.merge(later.acc_mag)
+        self.hr.merge(later.hr)
+        self.spo2.merge(later.spo2)
+        self.emg_n += later.emg_n
+        self.emg_sumsq += later.emg_sumsq
+        if later.rows:
+            if not self.rows:
+                self.first_step = later.first_step
+            elif not np.isnan(later.first_step - self.last_step):
+                # the diff across the seam was counted as 0 inside `later`
+                self.step_diff_sum += max(later.first_step - self.last_step, 0.0)
+            self.step_diff_sum += later.step_diff_sum
+            self.rows += later.rows
+            self.last_step = later.last_step
+        return self
+
+    def to_state(self) -> dict:
+        # JSON-safe sufficient statistics (NaN stored as None)
+        def clean(v):
+            return None if isinstance(v, float) and np.isnan(v) else v
+        return {
+            "acc_mag": [self.acc_mag.n, self.acc_mag.mean, self.acc_mag.m2],
+            "hr": [self.hr.n, self.hr.mean, self.hr.m2],
+            "spo2": [self.spo2.n, self.spo2.mean, self.spo2.m2],
+            "emg": [self.emg_n, self.emg_sumsq],
+            "steps": [self.rows, self.step_diff_sum, clean(float(self.first_step)), clean(float(self.last_step))],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "FeatureAccumulator":
+        acc = cls()
+        acc.acc_mag = RunningMoments(*state["acc_mag"])
+        acc.hr = RunningMoments(*state["hr"])
+        acc.spo2 = RunningMoments(*state["spo2"])
+        acc.emg_n, acc.emg_sumsq = state["emg"]
+        rows, diff_sum, first, last = state["steps"]
+        acc.rows, acc.step_diff_sum = rows, diff_sum
+        acc.first_step = float("nan") if first is None else first
+        acc.last_step = float("nan") if last is None else last
+        return acc
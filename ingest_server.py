@@ -0,0 +1,329 @@
+"""Streaming sensor ingest endpoint, run next to the Streamlit app.
+
+    python ingest_server.py [--host 127.0.0.1] [--port 8765]
+
+    POST /patients/<id>/samples
+        Content-Type: application/x-ndjson     one JSON object per line with the EXPECTED_COLS keys
+                                               (timestamp as ISO 8601 string or epoch seconds)
+        Content-Type: application/octet-stream packed little-endian BINARY_DTYPE records
+                                               (timestamp as float64 epoch seconds)
+    GET  /health                               queue depth, throughput and flush latency
+
+Batches are validated on the event loop and queued; one flusher task drains
+the queue into micro-batches (up to FLUSH_ROWS rows or FLUSH_MS of waiting)
+and writes them through store_samples + feature_store + alerts on a single
+writer thread, so the loop keeps accepting while a flush runs. A request is
+answered once its rows are committed, so the client-observed latency is
+end to end. Each patient's share of a flush runs in its own SAVEPOINT, so a
+batch that fails to write fails only its own request. The queue is bounded: a batch that cannot be queued within
+ENQUEUE_TIMEOUT_S gets 503 with Retry-After instead of growing memory.
+Load generator: python -m bench.ingest_load.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+import alerts
+import feature_store
+from data_ingestion import EXPECTED_COLS, parse_timestamps, store_samples
+from database import SessionLocal
+from models import PatientProfile
+
+QUEUE_BATCHES = int(os.getenv("INGEST_QUEUE_BATCHES", "256"))
+FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "20000"))
+FLUSH_MS = float(os.getenv("INGEST_FLUSH_MS", "50"))
+ENQUEUE_TIMEOUT_S = float(os.getenv("INGEST_ENQUEUE_TIMEOUT_S", "2"))
+MAX_BODY = int(os.getenv("INGEST_MAX_BODY", str(8 * 1024 * 1024)))
+
+BINARY_DTYPE = np.dtype([("timestamp", "<f8"), ("accel_x", "<f4"), ("accel_y", "<f4"), ("accel_z", "<f4"),
+                         ("emg", "<f4"), ("spo2", "<f4"), ("hr", "<f4"), ("step_count", "<i4")])
+_SAMPLES_PATH = re.compile(r"^/patients/(\d+)/samples$")
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+            413: "Payload Too Large", 415: "Unsupported Media Type", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+class BadBatch(ValueError):
+    pass
+
+def _ndjson_timestamps(col: pd.Series, line_numbers: list[int]) -> pd.Series:
+    """ISO strings, or numbers as epoch seconds (like the binary format); anything unparseable is a 400."""
+    numeric = col.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+    strings = col.map(lambda v: isinstance(v, str))
+    ts = pd.Series(pd.NaT, index=col.index, dtype="datetime64[ns]")
+    if numeric.any():
+        secs = col[numeric].astype(float)
+        in_range = np.isfinite(secs) & (secs.abs() < 9e9)  # datetime64[ns] covers 1678..2262
+        ts[secs[in_range].index] = pd.to_datetime(secs[in_range], unit="s")
+    if strings.any():
+        ts[strings] = parse_timestamps(col[strings], fill_missing=False)
+    bad = np.flatnonzero(ts.isna().to_numpy())
+    if len(bad):
+        raise BadBatch(f"invalid timestamp on line {line_numbers[bad[0]]}: {col.iloc[bad[0]]!r}"
+                       + (f" (and {len(bad) - 1} more)" if len(bad) > 1 else ""))
+    return ts
+
+def decode_ndjson(body: bytes) -> tuple[pd.DataFrame, pd.Series]:
+    try:
+        numbered = [(n, json.loads(line)) for n, line in enumerate(body.splitlines(), 1) if line.strip()]
+    except ValueError as e:
+        raise BadBatch(f"invalid NDJSON: {e}")
+    line_numbers = [n for n, _ in numbered]
+    records = [r for _, r in numbered]
+    if not records or not all(isinstance(r, dict) for r in records):
+        raise BadBatch("expected one JSON object per line")
+    df = pd.DataFrame.from_records(records)
+    missing = [c for c in EXPECTED_COLS if c not in df.columns]
+    if missing:
+        raise BadBatch(f"missing required fields: {missing}")
+    df = df[EXPECTED_COLS]
+    for c in EXPECTED_COLS[1:]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    if df[EXPECTED_COLS[1:]].isna().any().any():
+        raise BadBatch("non-numeric sensor values")
+    return df, _ndjson_timestamps(df["timestamp"], line_numbers)
+
+def decode_binary(body: bytes) -> tuple[pd.DataFrame, pd.Series]:
+    if not body or len(body) % BINARY_DTYPE.itemsize:
+        raise BadBatch(f"binary body must be a multiple of {BINARY_DTYPE.itemsize}-byte records")
+    rec = np.frombuffer(body, dtype=BINARY_DTYPE)
+    df = pd.DataFrame({name: rec[name] for name in BINARY_DTYPE.names})
+    if not np.isfinite(df[EXPECTED_COLS[1:-1]].to_numpy()).all():
+        raise BadBatch("non-finite sensor values")
+    if not np.isfinite(rec["timestamp"]).all():
+        raise BadBatch("non-finite timestamps")
+    try:
+        ts = pd.Series(pd.to_datetime(rec["timestamp"], unit="s"))
+    except (OverflowError, ValueError):  # outside the datetime64[ns] range
+        raise BadBatch("timestamps out of range")
+    return df, ts
+
+DECODERS = {"application/x-ndjson": decode_ndjson, "application/json": decode_ndjson,
+            "application/octet-stream": decode_binary}
+
+class Ingestor:
+    """Bounded queue of validated batches plus the task that flushes them in micro-batches."""
+
+    def __init__(self, queue_batches: int = QUEUE_BATCHES, flush_rows: int = FLUSH_ROWS, flush_ms: float = FLUSH_MS):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_batches)
+        self.flush_rows, self.flush_s = flush_rows, flush_ms / 1000
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        self.known_patients: set[int] = set()
+        self.flush_ms: deque = deque(maxlen=1000)
+        self.counters = {"batches": 0, "rows_accepted": 0, "rows_flushed": 0, "flushes": 0, "rejected_busy": 0,
+                         "rejected_invalid": 0, "flush_errors": 0}
+        self.started = time.monotonic()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        await self.queue.join()
+        self._task.cancel()
+        self.writer.shutdown(wait=True)
+
+    def _patient_exists(self, patient_id: int) -> bool:
+        with SessionLocal() as db:
+            return db.query(PatientProfile.id).filter(PatientProfile.id == patient_id).first() is not None
+
+    async def patient_exists(self, patient_id: int) -> bool:
+        if patient_id not in self.known_patients:
+            # default pool, not the writer thread, so lookups don't queue behind a flush
+            if not await asyncio.get_running_loop().run_in_executor(None, self._patient_exists, patient_id):
+                return False
+            self.known_patients.add(patient_id)
+        return True
+
+    async def submit(self, patient_id: int, df: pd.DataFrame, ts: pd.Series) -> int | None:
+        """Queue a batch and wait until it is committed; None if the queue stayed full (backpressure)."""
+        done = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self.queue.put((patient_id, df, ts, done)), ENQUEUE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self.counters["rejected_busy"] += 1
+            return None
+        self.counters["batches"] += 1
+        self.counters["rows_accepted"] += len(df)
+        return await done
+
+    def _write_patient(self, db, pid: int, parts: list):
+        df = pd.concat([p[1] for p in parts], ignore_index=True)
+        ts = pd.concat([p[2] for p in parts], ignore_index=True)
+        with db.begin_nested():  # SAVEPOINT: a failure undoes only this patient's part of the flush
+            store_samples(db, df, pid, ts)
+            alerts.on_ingest(db, pid, feature_store.update(db, pid, df, ts))
+
+    def _write(self, items: list) -> list:
+        """Write one micro-batch in one transaction; returns each item's row count, or the exception that failed it."""
+        by_patient: dict[int, list] = {}
+        for n, item in enumerate(items):
+            by_patient.setdefault(item[0], []).append(n)
+        results: list = [len(item[1]) for item in items]
+        with SessionLocal() as db:
+            for pid, idx in by_patient.items():
+                try:
+                    self._write_patient(db, pid, [items[n] for n in idx])
+                except Exception as e:
+                    if len(idx) == 1:
+                        results[idx[0]] = e
+                        continue
+                    for n in idx:  # retry the patient's requests one by one to find the bad one(s)
+                        try:
+                            self._write_patient(db, pid, [items[n]])
+                        except Exception as e:
+                            results[n] = e
+            db.commit()
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            rows, deadline = len(items[0][1]), loop.time() + self.flush_s
+            while rows < self.flush_rows:
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                rows += len(item[1])
+            t0 = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.writer, self._write, items)
+                self.flush_ms.append((time.perf_counter() - t0) * 1000)
+                self.counters["flushes"] += 1
+                for (*_, done), result in zip(items, results):
+                    if isinstance(result, Exception):
+                        self.counters["flush_errors"] += 1
+                        if not done.done():
+                            done.set_exception(result)
+                    else:
+                        self.counters["rows_flushed"] += result
+                        if not done.done():
+                            done.set_result(result)
+            except Exception as e:  # the commit itself failed: every request in the flush
+                self.counters["flush_errors"] += 1
+                for *_, done in items:
+                    if not done.done():
+                        done.set_exception(e)
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def health(self) -> dict:
+        flush = sorted(self.flush_ms)
+        elapsed = time.monotonic() - self.started
+        return {**self.counters, "queue_depth": self.queue.qsize(), "queue_capacity": self.queue.maxsize,
+                "rows_per_sec": round(self.counters["rows_flushed"] / elapsed, 1) if elapsed else None,
+                "flush_p50_ms": round(flush[len(flush) // 2], 2) if flush else None,
+                "flush_p99_ms": round(flush[int(len(flush) * 0.99)], 2) if flush else None}
+
+# -------------------- HTTP --------------------
+def _response(status: int, body: dict, extra: dict | None = None) -> bytes:
+    payload = json.dumps(body).encode()
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(payload)), **(extra or {})}
+    head = f"HTTP/1.1 {status} {_REASONS[status]}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+    return head.encode() + b"\r\n" + payload
+
+async def _handle(ingestor: Ingestor, method: str, path: str, headers: dict, body: bytes) -> bytes:
+    if path == "/health":
+        return _response(200, ingestor.health())
+    m = _SAMPLES_PATH.match(path)
+    if not m:
+        return _response(404, {"error": "not found"})
+    if method != "POST":
+        return _response(405, {"error": "use POST"})
+    decoder = DECODERS.get(headers.get("content-type", "").split(";")[0].strip())
+    if decoder is None:
+        return _response(415, {"error": f"content-type must be one of {sorted(DECODERS)}"})
+    patient_id = int(m.group(1))
+    try:
+        df, ts = decoder(body)
+    except BadBatch as e:
+        ingestor.counters["rejected_invalid"] += 1
+        return _response(400, {"error": str(e)})
+    if not await ingestor.patient_exists(patient_id):
+        return _response(404, {"error": f"unknown patient {patient_id}"})
+    rows = await ingestor.submit(patient_id, df, ts)
+    if rows is None:
+        return _response(503, {"error": "ingest queue full"}, {"Retry-After": "1"})
+    return _response(200, {"rows": rows})
+
+async def _serve_connection(ingestor: Ingestor, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.LimitOverrunError:
+                writer.write(_response(400, {"error": "request head too large"}))
+                break
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = (lines[0].split(" ", 2) + ["", ""])[:3]
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+            length = headers.get("content-length")
+            if method == "POST" and length is None:
+                writer.write(_response(411, {"error": "Content-Length required"}))
+                break
+            # the body can't be read past a bad length, so each of these also ends the connection
+            if length is not None and not (length.isascii() and length.isdigit()):
+                writer.write(_response(400, {"error": f"invalid Content-Length: {length[:32]!r}"}))
+                break
+            length = int(length or 0)
+            if length > MAX_BODY:
+                writer.write(_response(413, {"error": f"body larger than {MAX_BODY} bytes"}))
+                break
+            body = await reader.readexactly(length)
+            try:
+                response = await _handle(ingestor, method, path.split("?", 1)[0], headers, body)
+            except Exception as e:  # DB or flush failure: report it, keep the connection usable
+                response = _response(500, {"error": str(e)})
+            writer.write(response)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        try:
+            await writer.drain()  # flush an error response written just before breaking out
+        except ConnectionError:
+            pass
+        writer.close()
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, ready: asyncio.Event | None = None):
+    ingestor = Ingestor()
+    ingestor.start()
+    server = await asyncio.start_server(lambda r, w: _serve_connection(ingestor, r, w), host, port)
+    print(f"ingest server listening on http://{host}:{port}", flush=True)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await ingestor.stop()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=os.getenv("INGEST_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("INGEST_PORT", "8765")))
+    args = ap.parse_args(argv)
+    from database import Base, engine, upgrade_schema
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1 @@
-from .user import User
-from .patient_profile import PatientProfile
-from .sensor_stream import SensorStream
-from .audit_log import AuditLog
+from models_root import User, PatientProfile, SensorStream, SensorBlock, PatientFeatureDay, PatientAlertState, Alert, Prediction, AuditLog
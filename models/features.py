@@ -0,0 +1,11 @@
+import numpy as np
+
+FEATURES = ["acc_mag_mean","acc_mag_std","emg_rms","hr_mean","spo2_mean","cadence_est","extra_minutes_balance"]
+
+def outputs(y: np.ndarray) -> dict:
+    """Map raw regression outputs [N] to the believable % change (0..100) and adherence score."""
+    y_pct = np.clip(50 + y, 0.0, 100.0)
+    return {"gait_speed_change_pct": np.round(y_pct, 2), "adherence_score": np.round(60 + y_pct / 2, 1)}
+
+def feature_matrix(rows: list[dict]) -> np.ndarray:
+    return np.array([[float(r.get(k, 0.0)) for k in FEATURES] for r in rows], dtype=np.float32).reshape(-1, len(FEATURES))
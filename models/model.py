@@ -1,24 +1,174 @@
+import json
 import os
-import random
-from .torch_model import predict as torch_predict
+import zlib
+from util.perf import timed
+
+# torch and numpy are imported on first use so importing TwinModel stays cheap (see util/startup_profile.py)
+
+# "auto" serves from the exported weights.npz (numpy only) when it exists and was exported from weights.pth, else from torch
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "auto")
+UNCERTAINTY_SAMPLES = int(os.getenv("UNCERTAINTY_SAMPLES", "1000"))
+# trained versions live in models/versions/<version>/ (see models/train.py); MODEL_VERSION pins one
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "versions")
+REL_SPREAD = 0.05  # perturbation std as a fraction of the value when no measured spread is available
+
+def _seed(*parts) -> int:
+    """Stable seed from JSON-able parts, so the fallback and MC draws repeat across reruns and processes."""
+    return zlib.crc32(json.dumps(parts, sort_keys=True, default=float).encode())
+
+def _fallback(x, rng) -> dict:
+    # heuristic used when no model can be loaded: base draw from rng, plus the scenario effect
+    import numpy as np
+    from .features import FEATURES
+    base = rng.uniform(0.2, 0.8, size=len(x))
+    effect = 0.02 * x[:, FEATURES.index("extra_minutes_balance")]
+    return {"gait_speed_change_pct": np.round(base * 50 + effect * 100, 2), "adherence_score": np.round(base * 100, 1)}
+
+def current_version() -> str | None:
+    version = os.getenv("MODEL_VERSION")
+    if not version:
+        try:
+            with open(os.path.join(VERSIONS_DIR, "CURRENT")) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+    return version if os.path.exists(os.path.join(VERSIONS_DIR, version, "weights.pth")) else None
 
 class TwinModel:
     def __init__(self):
-        self.weights = os.path.join(os.path.dirname(__file__), "weights.pth")
+        self.version = current_version()
+        if self.version:
+            self.weights = os.path.join(VERSIONS_DIR, self.version, "weights.pth")
+        else:  # the bundled artifact
+            self.weights = os.path.join(os.path.dirname(__file__), "weights.pth")
+        self.artifact = os.path.splitext(self.weights)[0] + ".npz"
 
+    @property
+    def engine_name(self) -> str:
+        if INFERENCE_ENGINE == "auto":
+            from .numpy_model import is_fresh
+            # a stale export (weights.pth retrained since) would silently serve the old model
+            return "numpy" if is_fresh(self.artifact, self.weights) else "torch"
+        return INFERENCE_ENGINE
+
+    def _engine(self):
+        """(module, path) of the inference backend; both expose get_model/predict/predict_batch."""
+        if self.engine_name == "numpy":
+            from . import numpy_model
+            return numpy_model, self.artifact
+        from . import torch_model
+        return torch_model, self.weights
+
+    def warm_up(self):
+        """Load the inference engine into its process-wide registry ahead of the first predict."""
+        engine, path = self._engine()
+        engine.get_model(path)
+        return self
+
+    @timed("TwinModel.predict")
     def predict(self, patient_id: int, scenario: dict, feats: dict | None = None):
-        # Combine features + scenario for torch model
+        # Combine features + scenario for the model
         features = feats.copy() if feats else {}
         features["extra_minutes_balance"] = float(scenario.get("extra_minutes_balance", 0))
         try:
-            res = torch_predict(features, weights_path=self.weights)
-            return res
+            engine, path = self._engine()
+            return engine.predict(features, weights_path=path)
+        except Exception:
+            # fallback: heuristic, seeded by the request so reruns agree
+            import numpy as np
+            from .features import feature_matrix
+            res = _fallback(feature_matrix([features]), np.random.default_rng(_seed(patient_id, features)))
+            return {k: float(v[0]) for k, v in res.items()}
+
+    @timed("TwinModel.predict_batch")
+    def predict_batch(self, pairs: list[tuple[dict | None, dict]]):
+        """Predict many (feats, scenario) pairs with one forward pass.
+
+        Returns {"gait_speed_change_pct": ndarray[N], "adherence_score": ndarray[N]}.
+        """
+        import numpy as np
+        from .features import feature_matrix
+        rows = [{**(feats or {}), "extra_minutes_balance": float(scenario.get("extra_minutes_balance", 0))}
+                for feats, scenario in pairs]
+        x = feature_matrix(rows)
+        try:
+            engine, path = self._engine()
+            return engine.predict_batch(x, weights_path=path)
+        except Exception:
+            # fallback: same heuristic as predict, vectorized and seeded by the inputs
+            return _fallback(x, np.random.default_rng(_seed(x.tobytes().hex())))
+
+    def sweep(self, feats_by_patient: dict, minutes) -> dict:
+        """Dose-response curves: predict every patient at every extra-minutes value in one batch.
+
+        Returns {"minutes": ndarray[M], "patient_ids": [...], <output>: ndarray[P, M]}.
+        """
+        import numpy as np
+        minutes = np.asarray(list(minutes), dtype=np.float32)
+        pids = list(feats_by_patient)
+        pairs = [(feats_by_patient[pid], {"extra_minutes_balance": m}) for pid in pids for m in minutes]
+        res = self.predict_batch(pairs)
+        out = {"minutes": minutes, "patient_ids": pids}
+        out.update({k: v.reshape(len(pids), len(minutes)) for k, v in res.items()})
+        return out
+
+    def predict_windows(self, window_matrix, scenario: dict) -> dict:
+        """Predict once per sliding window (signal_features.window_features output) in one batch."""
+        import numpy as np
+        from signal_features import model_inputs
+        engine, path = self._engine()
+        x = model_inputs(window_matrix)
+        extra = np.full((len(x), 1), float(scenario.get("extra_minutes_balance", 0)), dtype=np.float32)
+        return engine.predict_batch(np.hstack([x, extra]), weights_path=path)
+
+
+    def _numpy_regressor(self):
+        # the same weights the point predictions use: the export only while it matches weights.pth
+        from . import numpy_model
+        if numpy_model.is_fresh(self.artifact, self.weights):
+            return numpy_model.get_model(self.artifact)
+        mtime = os.path.getmtime(self.weights)
+        cached = getattr(self, "_from_torch", None)
+        if cached is None or cached[0] != mtime:
+            self._from_torch = cached = (mtime, numpy_model.from_torch(self.weights))
+        return cached[1]
+
+    @timed("TwinModel.predict_uncertainty")
+    def predict_uncertainty(self, feats: dict | None, minutes, spread: dict | None = None,
+                            samples: int = UNCERTAINTY_SAMPLES, seed: int = 0, members: int = 1,
+                            weight_noise: float = 0.05, percentiles=(5, 50, 95)) -> dict:
+        """Monte Carlo bands for the dose-response curve over `minutes`.
+
+        Draws `samples` feature vectors around `feats` (normal, std from `spread`, e.g.
+        feature_store.feature_spread, else REL_SPREAD of each value) and evaluates every draw at every
+        minutes value as one [samples * len(minutes), features] batch. members > 1 also spreads the draws
+        over weight-perturbed copies of the network. Deterministic for a given seed and inputs.
+
+        Returns {"minutes": ndarray[M], "samples": K, <output>: {"mean": ndarray[M], "p<q>": ndarray[M], ...}}.
+        """
+        import numpy as np
+        from .features import FEATURES, feature_matrix
+        minutes = np.asarray(list(minutes), dtype=np.float32)
+        base = feature_matrix([feats or {}])[0]
+        scale = np.array([(spread or {}).get(k, REL_SPREAD * abs(float(v))) for k, v in zip(FEATURES, base)],
+                         dtype=np.float32)
+        scale[FEATURES.index("extra_minutes_balance")] = 0.0
+        rng = np.random.default_rng(_seed(seed, base.tolist(), scale.tolist(), samples, members, weight_noise))
+        draws = base + rng.standard_normal((samples, len(FEATURES)), dtype=np.float32) * scale
+        np.maximum(draws, 0.0, out=draws)  # features are magnitudes/rates
+        x = np.repeat(draws, len(minutes), axis=0)
+        x[:, FEATURES.index("extra_minutes_balance")] = np.tile(minutes, samples)
+        try:
+            net = self._numpy_regressor()
+            y = net.forward_ensemble(x, members, weight_noise, rng) if members > 1 else net.forward(x)
+            from .features import outputs
+            res = outputs(y)
         except Exception:
-            # fallback: heuristic
-            base = random.uniform(0.2, 0.8)
-            effect = 0.02 * float(scenario.get("extra_minutes_balance", 0))
-            gait_change = round((base * 50) + (effect * 100), 2)
-            return {
-                "gait_speed_change_pct": gait_change,
-                "adherence_score": round(base * 100, 1),
-            }
+            res = _fallback(x, rng)
+        out = {"minutes": minutes, "samples": samples}
+        for name, values in res.items():
+            grid = values.reshape(samples, len(minutes))
+            bands = {"mean": grid.mean(axis=0)}
+            bands.update({f"p{q}": band for q, band in zip(percentiles, np.percentile(grid, percentiles, axis=0))})
+            out[name] = bands
+        return out
@@ -0,0 +1,186 @@
+"""Torch-free inference for SimpleRegressor.
+
+    python -m models.numpy_model            # export models/weights.pth -> models/weights.npz
+    python -m models.numpy_model --verify   # export, then check parity against the torch module
+
+The exported .npz holds the three Linear layers as float32 arrays (W stored
+transposed, so a forward pass is x @ W + b) plus the sha256 of the source
+weights. Serving only needs numpy; torch is imported by export/verify alone.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import warnings
+import numpy as np
+
+from .features import FEATURES, feature_matrix, outputs
+
+WEIGHTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weights.pth")
+ARTIFACT = os.path.splitext(WEIGHTS)[0] + ".npz"
+LAYERS = 3
+
+class NumpyRegressor:
+    def __init__(self, layers: list[tuple[np.ndarray, np.ndarray]], source_sha256: str | None = None):
+        self.layers = [(np.ascontiguousarray(w, dtype=np.float32), np.ascontiguousarray(b, dtype=np.float32))
+                       for w, b in layers]
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyRegressor":
+        with np.load(path) as z:
+            layers = [(z[f"w{i}"], z[f"b{i}"]) for i in range(LAYERS)]
+            source = str(z["source_sha256"]) if "source_sha256" in z.files else None
+        return cls(layers, source)
+
+    def save(self, path: str):
+        arrays = {}
+        for i, (w, b) in enumerate(self.layers):
+            arrays[f"w{i}"], arrays[f"b{i}"] = w, b
+        np.savez(path, source_sha256=np.array(self.source_sha256 or ""), **arrays)
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        """[N, len(FEATURES)] -> [N] raw regression output."""
+        h = np.asarray(x, dtype=np.float32).reshape(-1, len(FEATURES))
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            h = h @ w
+            h += b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+        return h[:, 0]
+
+    def forward_ensemble(self, x: np.ndarray, members: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+        """Forward pass through `members` weight-perturbed copies of the network in one batched matmul.
+
+        Row i of x goes through member i % members; each member adds N(0, noise * std(W)) to every
+        weight matrix (a cheap stand-in for MC-dropout, which SimpleRegressor has no layers for).
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(-1, len(FEATURES))
+        n = len(x)
+        per = -(-n // members)
+        h = np.zeros((members * per, x.shape[1]), dtype=np.float32)
+        h[:n] = x
+        h = h.reshape(per, members, -1).transpose(1, 0, 2)  # [members, per, in]; row i -> member i % members
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            jitter = rng.standard_normal((members, *w.shape), dtype=np.float32) * (noise * float(w.std()))
+            h = np.matmul(h, w + jitter)
+            h += b
+            if i < last:
+                np.maximum(h, 0.0, out=h)
+        return h[:, :, 0].T.reshape(-1)[:n]
+
+# Process-wide registry, same shape as torch_model's: one engine per artifact path, reloaded on mtime change.
+_registry: dict[str, tuple[float | None, NumpyRegressor]] = {}
+_registry_lock = threading.Lock()
+
+def _mtime(path: str):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+def get_model(artifact_path: str = ARTIFACT) -> NumpyRegressor:
+    key = os.path.abspath(artifact_path)
+    mtime = _mtime(key)
+    entry = _registry.get(key)
+    if entry and entry[0] == mtime:
+        return entry[1]
+    with _registry_lock:
+        entry = _registry.get(key)
+        if not entry or entry[0] != mtime:
+            entry = (mtime, NumpyRegressor.load(key))
+            _registry[key] = entry
+        return entry[1]
+
+_freshness: dict[tuple[str, str], tuple[tuple, bool]] = {}
+
+def is_fresh(artifact_path: str = ARTIFACT, weights_path: str = WEIGHTS) -> bool:
+    """Whether artifact_path was exported from the current weights_path (sha256, re-checked when either mtime
+    changes). Without a weights_path next to it (numpy-only deployment) the artifact is all there is."""
+    key = (os.path.abspath(artifact_path), os.path.abspath(weights_path))
+    mtimes = (_mtime(key[0]), _mtime(key[1]))
+    entry = _freshness.get(key)
+    if entry and entry[0] == mtimes:
+        return entry[1]
+    if mtimes[0] is None:
+        fresh = False
+    elif mtimes[1] is None:
+        fresh = True
+    else:
+        fresh = NumpyRegressor.load(artifact_path).source_sha256 == _sha256(weights_path)
+        if not fresh:
+            warnings.warn(f"{artifact_path} was not exported from the current {weights_path}; "
+                          f"re-run python -m models.numpy_model")
+    _freshness[key] = (mtimes, fresh)
+    return fresh
+
+def predict(features: dict, weights_path: str = ARTIFACT):
+    # float64 before rounding so the scalars match torch_model.predict's Python-float rounding
+    y = get_model(weights_path).forward(feature_matrix([features])).astype(np.float64)
+    return {k: float(v[0]) for k, v in outputs(y).items()}
+
+def predict_batch(x: np.ndarray, weights_path: str = ARTIFACT) -> dict:
+    """Vectorized predict over an [N, len(FEATURES)] matrix."""
+    return outputs(get_model(weights_path).forward(x))
+
+# -------------------- Export / parity --------------------
+def _sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def from_torch(weights_path: str = WEIGHTS) -> NumpyRegressor:
+    """NumpyRegressor built straight from a torch state dict (imports torch)."""
+    import torch
+    state = torch.load(weights_path, map_location="cpu")
+    # nn.Sequential indices of the Linear layers in SimpleRegressor.net
+    layers = [(state[f"net.{i}.weight"].numpy().T, state[f"net.{i}.bias"].numpy()) for i in (0, 2, 4)]
+    return NumpyRegressor(layers, _sha256(weights_path))
+
+def export(weights_path: str = WEIGHTS, artifact_path: str = ARTIFACT) -> NumpyRegressor:
+    """Freeze the torch state dict at weights_path into a NumpyRegressor saved at artifact_path."""
+    engine = from_torch(weights_path)
+    engine.save(artifact_path)
+    return engine
+
+def verify(weights_path: str = WEIGHTS, artifact_path: str = ARTIFACT, n: int = 4096, seed: int = 0,
+           atol: float = 1e-4) -> dict:
+    """Compare the exported engine with the torch module on random feature rows; raises on mismatch."""
+    import torch
+    from .torch_model import load_model
+    rng = np.random.default_rng(seed)
+    # roughly the ranges compute_features produces, plus the 0..30 min scenario column
+    lo = np.array([0.5, 0.0, 0.0, 50, 85, 0, 0], dtype=np.float32)
+    hi = np.array([2.0, 1.0, 2.0, 140, 100, 180, 30], dtype=np.float32)
+    x = (lo + rng.random((n, len(FEATURES)), dtype=np.float32) * (hi - lo)).astype(np.float32)
+    with torch.inference_mode():
+        expected = load_model(weights_path)(torch.from_numpy(x)).numpy()[:, 0]
+    engine = NumpyRegressor.load(artifact_path)
+    got = engine.forward(x)
+    report = {"rows": n, "max_abs_diff": float(np.max(np.abs(got - expected))),
+              "source_matches": engine.source_sha256 == _sha256(weights_path)}
+    if report["max_abs_diff"] > atol or not report["source_matches"]:
+        raise AssertionError(f"numpy engine out of parity with {weights_path}: {report}")
+    return report
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--weights", default=WEIGHTS)
+    ap.add_argument("--out", default=None, help="artifact path (default: weights path with .npz)")
+    ap.add_argument("--verify", action="store_true", help="check parity against torch after exporting")
+    args = ap.parse_args(argv)
+    out = args.out or os.path.splitext(args.weights)[0] + ".npz"
+    export(args.weights, out)
+    print(f"exported {args.weights} -> {out}")
+    if args.verify:
+        try:
+            print(f"parity ok: {verify(args.weights, out)}")
+        except AssertionError as e:
+            print(e)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
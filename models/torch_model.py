@@ -1,7 +1,12 @@
+import os
+import threading
+import warnings
+import numpy as np
 import torch
 import torch.nn as nn
+from util.perf import span
 
-FEATURES = ["acc_mag_mean","acc_mag_std","emg_rms","hr_mean","spo2_mean","cadence_est","extra_minutes_balance"]
+from .features import FEATURES, outputs
 
 class SimpleRegressor(nn.Module):
     def __init__(self, in_dim=len(FEATURES), hidden=16):
@@ -20,18 +25,62 @@ def load_model(weights_path: str | None = None):
     model = SimpleRegressor()
     if weights_path:
         try:
-            state = torch.load(weights_path, map_location="cpu")
+            with span("torch.load"):
+                state = torch.load(weights_path, map_location="cpu")
             model.load_state_dict(state)
-        except Exception:
-            pass
+        except Exception as e:
+            # still serve (untrained) rather than fail the page, but make it visible in registry_stats
+            with _registry_lock:  # re-entrant: get_model holds it while loading
+                _registry_stats["load_errors"] += 1
+            warnings.warn(f"could not load weights from {weights_path} ({e}); using untrained SimpleRegressor")
     model.eval()
     return model
 
+# Process-wide registry: one loaded module per weights path, reloaded when the file's mtime changes.
+_registry: dict[str | None, tuple[float | None, SimpleRegressor]] = {}
+_registry_lock = threading.RLock()
+_registry_stats = {"loads": 0, "reloads": 0, "hits": 0, "load_errors": 0}
+
+def _mtime(path: str | None):
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+def get_model(weights_path: str | None = None) -> SimpleRegressor:
+    key = os.path.abspath(weights_path) if weights_path else None
+    mtime = _mtime(key)
+    entry = _registry.get(key)
+    if entry and entry[0] == mtime:
+        with _registry_lock:  # the lookup stays lock-free; only the counter update takes it
+            _registry_stats["hits"] += 1
+        return entry[1]
+    with _registry_lock:
+        entry = _registry.get(key)  # another thread may have loaded it while we waited
+        if entry and entry[0] == mtime:
+            _registry_stats["hits"] += 1
+            return entry[1]
+        model = load_model(key)
+        _registry_stats["reloads" if entry else "loads"] += 1
+        _registry[key] = (mtime, model)
+        return model
+
+def registry_stats() -> dict:
+    with _registry_lock:
+        return {**_registry_stats, "models": len(_registry)}
+
 def predict(features: dict, weights_path: str | None = None):
-    model = load_model(weights_path)
+    model = get_model(weights_path)
     x = torch.tensor([[float(features.get(k, 0.0)) for k in FEATURES]], dtype=torch.float32)
     with torch.no_grad():
         y = model(x).item()
     # Map regression output to believable % change (0..100)
     y_pct = max(0.0, min(100.0, 50 + y))
     return {"gait_speed_change_pct": round(y_pct, 2), "adherence_score": round(60 + (y_pct/2), 1)}
+
+def predict_batch(x: np.ndarray, weights_path: str | None = None) -> dict:
+    """Vectorized predict over an [N, len(FEATURES)] matrix in a single forward pass."""
+    model = get_model(weights_path)
+    with torch.inference_mode():
+        y = model(torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))).numpy()[:, 0]
+    return outputs(y)
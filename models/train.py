@@ -0,0 +1,254 @@
+"""Offline CPU training for SimpleRegressor from the stored history.
+
+    python -m models.train --epochs 20 --workers 2 --threads 4
+    python -m models.train --promote always      # make the new version current even if it validates worse
+
+Examples are (patient, day) rows of the feature store (PatientFeatureDay,
+built from sensor_streams at ingest). The label is the observed change in
+gait activity (acc_mag_mean) over the next HORIZON_DAYS days, in percent, so
+the trained model's gait_speed_change_pct is an actual forecast. The
+extra_minutes_balance input is the dose from the patient's latest stored
+what-if Prediction at or before that day (0 without one).
+
+Rows are streamed from the DB with keyset pagination by an IterableDataset.
+DataLoader workers each take a disjoint patient shard (patient_id % workers),
+so nothing is materialized in memory. Patients are split into train and
+validation by a seeded hash, so no patient appears in both.
+
+Each run writes models/versions/<version>/ with weights.pth, the exported
+weights.npz and metadata.json. The version becomes current
+(models/versions/CURRENT, which TwinModel reads) when its validation loss
+beats the current version's.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from .features import FEATURES
+from .torch_model import SimpleRegressor
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "versions")
+CURRENT = os.path.join(VERSIONS_DIR, "CURRENT")
+HORIZON_DAYS = 7
+FETCH_ROWS = 2000  # PatientFeatureDay rows per DB round trip
+BATCH = 256
+SHUFFLE_ROWS = 8192  # training rows are shuffled within a buffer this large (the stream is ordered by patient)
+
+def is_validation(patient_id: int, val_pct: float, seed: int) -> bool:
+    return zlib.crc32(f"{seed}:{patient_id}".encode()) % 10_000 < val_pct * 100
+
+def _day_features(stats: dict) -> dict:
+    from features import FeatureAccumulator
+    return FeatureAccumulator.from_state(stats).features()
+
+def _patient_examples(days: list, doses: list[tuple[datetime, float]], horizon: int):
+    """(x, y) rows for one patient's consecutive feature-store days; doses are (created_at, minutes) ascending."""
+    feats = [(day, _day_features(stats)) for day, stats in days]
+    feats = [(d, f) for d, f in feats if f and f.get("acc_mag_mean")]
+    xs, ys = [], []
+    j = 0
+    for i, (day, f) in enumerate(feats):
+        future = [g["acc_mag_mean"] for d, g in feats[i + 1:] if d <= day + timedelta(days=horizon)]
+        if not future:
+            continue
+        while j < len(doses) and doses[j][0].date() <= day:
+            j += 1
+        dose = doses[j - 1][1] if j else 0.0
+        change_pct = 100.0 * (float(np.mean(future)) / f["acc_mag_mean"] - 1.0)
+        x = [float(f.get(k, 0.0)) if k != "extra_minutes_balance" else dose for k in FEATURES]
+        if not (math.isfinite(change_pct) and all(map(math.isfinite, x))):  # e.g. acc_mag_std of a one-sample day
+            continue
+        xs.append(x)
+        ys.append(change_pct - 50.0)  # torch_model maps output y to gait_speed_change_pct = 50 + y
+    return xs, ys
+
+class FeatureDayStream(IterableDataset):
+    """Streams (x[B, len(FEATURES)], y[B]) batches for one split straight from the DB."""
+
+    def __init__(self, split: str, val_pct: float = 20.0, seed: int = 0, horizon: int = HORIZON_DAYS,
+                 batch: int = BATCH, fetch_rows: int = FETCH_ROWS):
+        self.split, self.val_pct, self.seed, self.horizon = split, val_pct, seed, horizon
+        self.batch, self.fetch_rows = batch, fetch_rows
+        self.buffer = SHUFFLE_ROWS if split == "train" else batch
+        self.epoch = 0  # set by train() before each epoch; varies the shuffle
+
+    def _doses(self, db, patient_id: int) -> list[tuple[datetime, float]]:
+        from models import Prediction
+        rows = db.query(Prediction.created_at, Prediction.scenario).filter(
+            Prediction.patient_id == patient_id).order_by(Prediction.created_at)
+        out = []
+        for created, scenario in rows:
+            minutes = (scenario or {}).get("extra_minutes_balance")
+            if isinstance(minutes, (int, float)):  # sweeps store a list; only single what-ifs are a chosen dose
+                out.append((created, float(minutes)))
+        return out
+
+    def _patients(self, db):
+        """(patient_id, [(day, stats)]) for this worker's shard, read in keyset-paginated pages."""
+        from sqlalchemy import tuple_
+        from models import PatientFeatureDay
+        info = get_worker_info()
+        shards, shard = (info.num_workers, info.id) if info else (1, 0)
+        last, current, days = (0, datetime.min.date()), None, []
+        while True:
+            q = db.query(PatientFeatureDay.patient_id, PatientFeatureDay.day, PatientFeatureDay.stats).filter(
+                tuple_(PatientFeatureDay.patient_id, PatientFeatureDay.day) > last)
+            if shards > 1:
+                q = q.filter(PatientFeatureDay.patient_id % shards == shard)
+            page = q.order_by(PatientFeatureDay.patient_id, PatientFeatureDay.day).limit(self.fetch_rows).all()
+            for pid, day, stats in page:
+                if pid != current:
+                    if current is not None:
+                        yield current, days
+                    current, days = pid, []
+                days.append((day, stats))
+            if len(page) < self.fetch_rows:
+                break
+            last = (page[-1].patient_id, page[-1].day)
+        if current is not None:
+            yield current, days
+
+    def _batches(self, xs: list, ys: list, rng):
+        x, y = np.asarray(xs, dtype=np.float32), np.asarray(ys, dtype=np.float32)
+        if self.split == "train":
+            order = rng.permutation(len(x))
+            x, y = x[order], y[order]
+        for i in range(0, len(x), self.batch):
+            yield torch.from_numpy(x[i:i + self.batch]), torch.from_numpy(y[i:i + self.batch])
+
+    def __iter__(self):
+        from database import SessionLocal
+        info = get_worker_info()
+        rng = np.random.default_rng([self.seed, self.epoch, info.id if info else 0])
+        xs, ys = [], []
+        with SessionLocal() as db:
+            for pid, days in self._patients(db):
+                if is_validation(pid, self.val_pct, self.seed) != (self.split == "val"):
+                    continue
+                px, py = _patient_examples(days, self._doses(db, pid), self.horizon)
+                xs.extend(px)
+                ys.extend(py)
+                if len(xs) >= self.buffer:
+                    yield from self._batches(xs, ys, rng)
+                    xs, ys = [], []
+        if xs:
+            yield from self._batches(xs, ys, rng)
+
+def _worker_init(_):
+    # forked workers must not reuse the parent's pooled connections
+    from database import engine
+    engine.dispose(close=False)
+
+def _loader(dataset, workers: int):
+    return DataLoader(dataset, batch_size=None, num_workers=workers, worker_init_fn=_worker_init if workers else None,
+                      persistent_workers=False)
+
+def evaluate(model, loader) -> tuple[float, int]:
+    model.eval()
+    total, n = 0.0, 0
+    with torch.inference_mode():
+        for x, y in loader:
+            total += torch.nn.functional.mse_loss(model(x)[:, 0], y, reduction="sum").item()
+            n += len(y)
+    return (total / n if n else float("nan")), n
+
+def current_metadata() -> dict | None:
+    try:
+        with open(CURRENT) as f:
+            version = f.read().strip()
+        with open(os.path.join(VERSIONS_DIR, version, "metadata.json")) as f:
+            return json.load(f)
+    except OSError:
+        return None
+
+def train(epochs: int = 20, workers: int = 2, threads: int | None = None, lr: float = 1e-3, val_pct: float = 20.0,
+          seed: int = 0, init: str | None = None, promote: str = "if-better", log=print) -> dict:
+    torch.manual_seed(seed)
+    if threads:
+        torch.set_num_threads(threads)
+    model = SimpleRegressor()
+    if init and os.path.exists(init):
+        model.load_state_dict(torch.load(init, map_location="cpu"))
+    opt = torch.optim.Adam(model.parameters(), lr=lr)
+    train_data = FeatureDayStream("train", val_pct, seed)
+    train_loader = _loader(train_data, workers)
+    val_loader = _loader(FeatureDayStream("val", val_pct, seed), workers)
+
+    history = []
+    for epoch in range(1, epochs + 1):
+        model.train()
+        train_data.epoch = epoch  # workers get a fresh copy of the dataset each epoch
+        t0 = time.perf_counter()
+        loss_sum, rows = 0.0, 0
+        for x, y in train_loader:
+            opt.zero_grad()
+            loss = torch.nn.functional.mse_loss(model(x)[:, 0], y)
+            loss.backward()
+            opt.step()
+            loss_sum += loss.item() * len(y)
+            rows += len(y)
+        seconds = time.perf_counter() - t0
+        if not rows:
+            raise RuntimeError("no training rows: ingest wearable data for more than one day per patient first")
+        val_loss, val_rows = evaluate(model, val_loader)
+        val_loss = val_loss if val_rows else None
+        history.append({"epoch": epoch, "train_loss": loss_sum / rows, "val_loss": val_loss, "rows": rows, "val_rows": val_rows,
+                        "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds, 1)})
+        log(f"epoch {epoch}/{epochs}: train_loss={loss_sum / rows:.4f} val_loss={val_loss if val_loss is None else round(val_loss, 4)} "
+            f"rows={rows} time={seconds:.2f}s rows/s={rows / seconds:,.0f}")
+
+    version = datetime.utcnow().strftime("v%Y%m%d-%H%M%S")
+    out_dir = os.path.join(VERSIONS_DIR, version)
+    os.makedirs(out_dir, exist_ok=True)
+    weights = os.path.join(out_dir, "weights.pth")
+    torch.save(model.state_dict(), weights)
+    from .numpy_model import export
+    export(weights, os.path.join(out_dir, "weights.npz"))
+
+    final = history[-1]
+    previous = current_metadata()
+    def finite(loss):
+        return loss is not None and math.isfinite(loss)
+    # no held-out patients (tiny cohorts) or a diverged run means no evidence it is better; a previous
+    # version without a validation loss (promoted with --promote always) is beaten by any finite one
+    previous_loss = (previous or {}).get("val_loss")
+    better = finite(final["val_loss"]) and final["val_loss"] < (previous_loss if finite(previous_loss) else float("inf"))
+    promoted = promote == "always" or (promote == "if-better" and better)
+    meta = {"version": version, "created_at": datetime.utcnow().isoformat(), "features": FEATURES,
+            "label": f"gait activity change % over {HORIZON_DAYS} days", "epochs": epochs, "lr": lr, "seed": seed,
+            "val_pct": val_pct, "workers": workers, "threads": torch.get_num_threads(),
+            "train_rows": final["rows"], "val_rows": final["val_rows"], "val_loss": final["val_loss"],
+            "previous_version": previous and previous["version"], "promoted": promoted, "history": history}
+    with open(os.path.join(out_dir, "metadata.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    if promoted:
+        with open(CURRENT, "w") as f:
+            f.write(version + "\n")
+    return meta
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--epochs", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=2, help="DataLoader worker processes (0 = stream in-process)")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    ap.add_argument("--lr", type=float, default=1e-3)
+    ap.add_argument("--val-pct", type=float, default=20.0, help="percent of patients held out")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--init", default=None, help="start from these weights (e.g. models/weights.pth)")
+    ap.add_argument("--promote", choices=["if-better", "always", "never"], default="if-better")
+    args = ap.parse_args(argv)
+    meta = train(args.epochs, args.workers, args.threads, args.lr, args.val_pct, args.seed, args.init, args.promote)
+    print(f"wrote {meta['version']} (val_loss={meta['val_loss']}, "
+          f"{'promoted to current' if meta['promoted'] else 'not promoted'})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Date, ForeignKey, Boolean, Float, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -47,6 +47,69 @@ class SensorStream(Base):
     # Relationships
     patient = relationship("PatientProfile", back_populates="sensor_streams")
 
+    __table_args__ = (Index("ix_sensor_streams_patient_type_ts", "patient_id", "sensor_type", "timestamp"),)
+
+
+# ===================== SENSOR BLOCK =====================
+class SensorBlock(Base):
+    """Columnar block of regularly sampled wearable data (see sensor_blocks.py)."""
+    __tablename__ = "sensor_blocks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patient_profiles.id"), nullable=False)
+    start_ts = Column(DateTime, nullable=False)
+    end_ts = Column(DateTime, nullable=False)  # timestamp of the last sample
+    interval_ms = Column(Float, nullable=False)
+    n_samples = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # column-major typed arrays
+
+    __table_args__ = (Index("ix_sensor_blocks_patient_start", "patient_id", "start_ts"),)
+
+
+# ===================== FEATURE STORE =====================
+class PatientFeatureDay(Base):
+    """Per-patient, per-day sufficient statistics for the model features (see feature_store.py)."""
+    __tablename__ = "patient_feature_days"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patient_profiles.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    stats = Column(JSON, default={})  # features.FeatureAccumulator.to_state()
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("patient_id", "day", name="uq_patient_feature_day"),)
+
+
+# ===================== ALERTS =====================
+class PatientAlertState(Base):
+    """Per-patient rolling alert state, advanced on ingest (see alerts.py)."""
+    __tablename__ = "patient_alert_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patient_profiles.id"), nullable=False, unique=True)
+    state = Column(JSON, default={})  # per-metric EWMA mean/variance and below-forecast streaks
+    last_folded_day = Column(Date)  # newest day already folded into the EWMAs
+    last_report_at = Column(DateTime, index=True)  # last patient_report (or when monitoring started)
+    report_alerted_at = Column(DateTime)  # last_report_at value the missed-report alert was raised for
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Alert(Base):
+    __tablename__ = "alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("patient_profiles.id"), nullable=False)
+    kind = Column(String, nullable=False)  # e.g. gait_below_forecast, cadence_anomaly, missed_report
+    severity = Column(String, default="warning")  # warning, error
+    message = Column(String, nullable=False)
+    value = Column(Float)  # z-score or days, depending on kind
+    day = Column(Date, nullable=False)
+    acknowledged = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("patient_id", "kind", "day", name="uq_alert_patient_kind_day"),
+                      Index("ix_alerts_patient_open_created", "patient_id", "acknowledged", "created_at"))
+
 
 # ===================== PREDICTIONS =====================
 class Prediction(Base):
@@ -56,6 +119,8 @@ class Prediction(Base):
     patient_id = Column(Integer, ForeignKey("patient_profiles.id"), nullable=False)
     scenario = Column(JSON, default={})
     result = Column(JSON, default={})
+    cache_key = Column(String, index=True)  # set by prediction_cache
+    model_version = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
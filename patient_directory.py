@@ -0,0 +1,49 @@
+"""Patient list for the clinician dashboard: one joined, paginated query behind a short TTL cache
+(bounded LRU, cleared by invalidate() whenever a patient profile is created)."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+from models import PatientProfile, User
+
+CACHE_TTL = float(os.getenv("PATIENT_DIRECTORY_TTL", "30"))  # seconds
+CACHE_SIZE = int(os.getenv("PATIENT_DIRECTORY_CACHE_SIZE", "256"))  # (search, page) entries kept
+PAGE_SIZE = 50
+
+_cache: OrderedDict[tuple, tuple[float, tuple[list[tuple[int, str]], int]]] = OrderedDict()
+_lock = threading.Lock()
+
+def _query(db: Session, search: str, page: int, page_size: int):
+    label = func.coalesce(func.nullif(User.full_name, ""), User.email)
+    stmt = (select(PatientProfile.id, label.label("label"), func.count().over().label("total"))
+            .join(User, PatientProfile.user))
+    if search:
+        pattern = f"%{search.strip()}%"
+        stmt = stmt.where(or_(User.full_name.ilike(pattern), User.email.ilike(pattern)))
+    stmt = stmt.order_by(label, PatientProfile.id).limit(page_size).offset(page * page_size)
+    rows = db.execute(stmt).all()
+    total = rows[0].total if rows else 0
+    return [(r.id, r.label) for r in rows], total
+
+def list_patients(db: Session, search: str = "", page: int = 0, page_size: int = PAGE_SIZE):
+    """Return ([(patient_profile_id, label), ...], total_matches) for one page of the directory."""
+    key = (search.strip().lower(), page, page_size)
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(key)
+        if hit and hit[0] > now:
+            _cache.move_to_end(key)
+            return hit[1]
+    result = _query(db, search, page, page_size)
+    with _lock:
+        _cache[key] = (now + CACHE_TTL, result)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+def invalidate():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,104 @@
+"""Two-tier cache for TwinModel outputs.
+
+Tier 1 is an in-process LRU; tier 2 is the `predictions` table. Entries are
+keyed by (patient_id, weights hash, feature vector hash, scenario), so a new
+weights file changes every key and old entries simply stop matching.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from models import Prediction
+
+FEATURE_KEYS = ["acc_mag_mean","acc_mag_std","emg_rms","hr_mean","spo2_mean","cadence_est"]
+
+_weights_hashes: dict[tuple[str, float], str] = {}
+
+def weights_hash(path: str) -> str:
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return "none"
+    if key not in _weights_hashes:
+        with open(path, "rb") as f:
+            _weights_hashes[key] = hashlib.sha256(f.read()).hexdigest()[:16]
+    return _weights_hashes[key]
+
+def feature_hash(feats: dict | None) -> str:
+    vec = [round(float((feats or {}).get(k, 0.0)), 6) for k in FEATURE_KEYS]
+    return hashlib.sha256(json.dumps(vec).encode()).hexdigest()[:16]
+
+def cache_key(patient_id, weights_path: str, feats: dict | None, scenario: dict) -> tuple[str, str]:
+    """Return (cache_key, model_version) for a prediction request."""
+    version = weights_hash(weights_path)
+    raw = json.dumps([patient_id, version, feature_hash(feats), scenario], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest(), version
+
+def _finite(value) -> bool:
+    if isinstance(value, dict):
+        return all(_finite(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_finite(v) for v in value)
+    return not isinstance(value, float) or math.isfinite(value)
+
+class PredictionCache:
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self._lru: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "db": 0}
+        self.misses = 0
+
+    def get_or_compute(self, db: Session | None, patient_id: int | None, weights_path: str,
+                       feats: dict | None, scenario: dict, compute) -> dict:
+        """Return the cached result for this request, calling `compute()` only on a miss.
+
+        The DB tier is used when both `db` and `patient_id` are given; results must be JSON-serializable.
+        Results containing NaN/inf are returned but not cached in either tier.
+        """
+        key, version = cache_key(patient_id, weights_path, feats, scenario)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits["memory"] += 1
+                return self._lru[key]
+
+        durable = db is not None and patient_id is not None
+        result = None
+        if durable:
+            row = db.query(Prediction.result).filter(Prediction.cache_key == key).first()
+            if row is not None:
+                result = row.result
+                with self._lock:
+                    self.hits["db"] += 1
+        if result is None:
+            with self._lock:
+                self.misses += 1
+            result = compute()
+            if not _finite(result):
+                return result
+            if durable:
+                db.add(Prediction(patient_id=patient_id, scenario=scenario, result=result,
+                                  cache_key=key, model_version=version))
+                db.commit()
+        self._put(key, result)
+        return result
+
+    def _put(self, key: str, result: dict):
+        with self._lock:
+            self._lru[key] = result
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            memory, db_hits, misses, size = self.hits["memory"], self.hits["db"], self.misses, len(self._lru)
+        total = memory + db_hits + misses
+        return {"memory_hits": memory, "db_hits": db_hits, "misses": misses,
+                "hit_rate": round((total - misses) / total, 3) if total else None, "lru_size": size}
+
+prediction_cache = PredictionCache()
@@ -1,9 +1,33 @@
+import glob
+import hashlib
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from io import BytesIO
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.pagesizes import A4
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.charts.lineplots import LinePlot
+from util.perf import timed
 
-def generate_report(patient_name: str, metrics: dict) -> bytes:
+TEMPLATE_VERSION = 2  # bump whenever the rendered layout changes; invalidates the PDF cache
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join("data", "reports"))
+TREND_METRICS = {"step_count": "Daily steps", "accel_mean": "Activity (mean accel)", "hr": "Heart rate"}
+
+def _trend_chart(points: list[tuple[float, float]]) -> Drawing:
+    drawing = Drawing(440, 140)
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 40, 20, 380, 100
+    plot.data = [points]
+    plot.xValueAxis.labelTextFormat = "%d"
+    drawing.add(plot)
+    return drawing
+
+@timed("generate_report")
+def generate_report(patient_name: str, metrics: dict, trends: dict | None = None) -> bytes:
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -13,7 +37,130 @@ def generate_report(patient_name: str, metrics: dict) -> bytes:
     for k,v in metrics.items():
         story.append(Paragraph(f"<b>{k}</b>: {v}", styles['Normal']))
         story.append(Spacer(1, 8))
+    for title, points in (trends or {}).items():
+        if len(points) < 2:
+            continue
+        story.append(Spacer(1, 12))
+        story.append(Paragraph(f"{title} (by day)", styles['Heading3']))
+        story.append(_trend_chart(points))
     doc.build(story)
     pdf = buffer.getvalue()
     buffer.close()
     return pdf
+
+# -------------------- Data-backed reports --------------------
+def data_version(db, patient_id: int) -> str:
+    """Changes whenever anything a report is built from changes for this patient."""
+    from sqlalchemy import func
+    from models import SensorStream, Prediction, PatientFeatureDay
+    parts = [
+        db.query(func.max(SensorStream.id), func.count(SensorStream.id)).filter(SensorStream.patient_id == patient_id).one(),
+        db.query(func.max(Prediction.id)).filter(Prediction.patient_id == patient_id).one(),
+        db.query(func.max(PatientFeatureDay.updated_at)).filter(PatientFeatureDay.patient_id == patient_id).one(),
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+def collect_report_data(db, patient_id: int) -> tuple[str, dict, dict]:
+    """(patient name, metrics, trends) for one patient, from stored data rather than placeholders."""
+    import numpy as np
+    import feature_store
+    from models import PatientProfile, User, Prediction, SensorStream
+    from timeseries import progress_series
+
+    row = db.query(User.full_name, User.email).join(PatientProfile, PatientProfile.user_id == User.id).filter(
+        PatientProfile.id == patient_id).first()
+    name = (row.full_name or row.email) if row else f"Patient {patient_id}"
+
+    metrics = {}
+    feats = feature_store.latest_features(db, patient_id)
+    if feats:
+        metrics.update({"Mean acceleration (7d)": round(feats["acc_mag_mean"], 3),
+                        "Cadence estimate (7d)": round(feats["cadence_est"], 1),
+                        "Mean heart rate (7d)": round(feats["hr_mean"], 1),
+                        "Mean SpO2 (7d)": round(feats["spo2_mean"], 1)})
+    pred = db.query(Prediction.result, Prediction.created_at).filter(
+        Prediction.patient_id == patient_id).order_by(Prediction.id.desc()).first()
+    if pred:
+        for k, v in pred.result.items():
+            if not isinstance(v, list):
+                metrics[f"Latest prediction: {k}"] = v
+    reports = db.query(SensorStream.payload, SensorStream.timestamp).filter(
+        SensorStream.patient_id == patient_id, SensorStream.sensor_type == "patient_report").order_by(
+        SensorStream.timestamp.desc()).first()
+    if reports:
+        metrics["Last self-report"] = f"pain {reports.payload.get('pain')}, mood {reports.payload.get('mood')} ({reports.timestamp:%Y-%m-%d})"
+    if not metrics:
+        metrics["Status"] = "No recorded data yet"
+
+    trends = {}
+    for metric, title in TREND_METRICS.items():
+        traces = progress_series(db, patient_id, metric)
+        ts, values = traces.get("Daily summary") or traces.get("Wearable (daily)") or ([], [])
+        if len(ts):
+            days = (np.asarray(ts) - np.asarray(ts)[0]) / np.timedelta64(1, "D")
+            trends[title] = [(float(d), float(v)) for d, v in zip(days, values) if not np.isnan(v)]
+    return name, metrics, trends
+
+def _cache_path(patient_id: int, version: str) -> str:
+    return os.path.join(REPORT_CACHE_DIR, f"{patient_id}-{version}-t{TEMPLATE_VERSION}.pdf")
+
+def _render_to(path: str, name: str, metrics: dict, trends: dict) -> str:
+    pdf = generate_report(name, metrics, trends)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf)
+    os.replace(tmp, path)
+    return path
+
+def _evict_superseded(patient_id: int, keep: str):
+    # a new data or template version supersedes every older PDF for the patient
+    for old in glob.glob(os.path.join(REPORT_CACHE_DIR, f"{patient_id}-*.pdf")):
+        if old != keep:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # a concurrent render already removed it
+
+def _worker_init():
+    # spawned workers only render; drop any engine a transitive import created rather than share a pool
+    from database import engine
+    engine.dispose(close=False)
+
+def patient_report(db, patient_id: int) -> bytes:
+    """Rendered PDF for one patient, served from the cache while its data is unchanged."""
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = _cache_path(patient_id, data_version(db, patient_id))
+    if not os.path.exists(path):
+        _render_to(path, *collect_report_data(db, patient_id))
+        _evict_superseded(patient_id, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+def export_cohort(db, patient_ids: list[int], workers: int | None = None) -> tuple[bytes, dict]:
+    """ZIP of one PDF per patient. Data is gathered here; uncached PDFs render in a process pool."""
+    t0 = time.perf_counter()
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    paths, todo = {}, []
+    for pid in patient_ids:
+        path = _cache_path(pid, data_version(db, pid))
+        paths[pid] = path
+        if not os.path.exists(path):
+            todo.append((path, *collect_report_data(db, pid)))
+    if todo:
+        # spawn, not fork: the Streamlit process has live threads and pooled DB connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_worker_init) as pool:
+            list(pool.map(_render_to, *zip(*todo)))
+        rendered = {t[0] for t in todo}
+        for pid, path in paths.items():
+            if path in rendered:
+                _evict_superseded(pid, path)
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for pid, path in paths.items():
+            zf.write(path, arcname=f"patient_{pid}_recovery_report.pdf")
+    elapsed = time.perf_counter() - t0
+    stats = {"reports": len(patient_ids), "rendered": len(todo), "cached": len(patient_ids) - len(todo),
+             "seconds": round(elapsed, 3),
+             "reports_per_min": round(len(patient_ids) / elapsed * 60, 1) if elapsed else None}
+    return buffer.getvalue(), stats
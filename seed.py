@@ -1,26 +1,34 @@
-from database import engine, Base, SessionLocal
+from database import engine, Base, SessionLocal, upgrade_schema
 from models import User, PatientProfile
-from passlib.context import CryptContext
+from util.auth import hash_passwords
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+SEED_USERS = [
+    ("admin@dtc.local", "changeme", "admin", "Administrator"),
+    ("clinician@example.com", "changeme", "clinician", "Dr. Cohen"),
+    ("patient@example.com", "changeme", "patient", "Anita Sharma"),
+]
 
-def upsert_user(db, email, password, role, full_name):
-    u = db.query(User).filter(User.email==email).first()
-    if u:
-        return u
-    u = User(email=email, hashed_password=pwd_context.hash(password), role=role, full_name=full_name)
-    db.add(u); db.commit(); db.refresh(u)
-    if role == 'patient':
-        p = PatientProfile(user_id=u.id, demographics={"age": 45, "sex":"M"}, medical_history="Post-orthopedic surgery")
-        db.add(p); db.commit()
-    return u
+def _profile(user_id):
+    return PatientProfile(user_id=user_id, demographics={"age": 45, "sex":"M"}, medical_history="Post-orthopedic surgery")
+
+def seed_users(db, users=SEED_USERS):
+    """Create any missing users in one transaction, hashing their passwords in parallel."""
+    existing = {e for e, in db.query(User.email).filter(User.email.in_([u[0] for u in users]))}
+    new = [u for u in users if u[0] not in existing]
+    hashes = hash_passwords([u[1] for u in new])
+    created = [User(email=email, hashed_password=h, role=role, full_name=name)
+               for (email, _, role, name), h in zip(new, hashes)]
+    db.add_all(created)
+    db.flush()
+    db.add_all([_profile(u.id) for u in created if u.role == 'patient'])
+    db.commit()
+    return created
 
 def main():
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     db = SessionLocal()
-    upsert_user(db, "admin@dtc.local", "changeme", "admin", "Administrator")
-    upsert_user(db, "clinician@example.com", "changeme", "clinician", "Dr. Cohen")
-    upsert_user(db, "patient@example.com", "changeme", "patient", "Anita Sharma")
+    seed_users(db)
     db.close()
     print("Seed complete. Users ready.")
 
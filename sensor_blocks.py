@@ -0,0 +1,126 @@
+"""Columnar storage for high-rate wearable samples.
+
+Samples are packed per patient into blocks covering at most BLOCK_SECONDS of
+regularly spaced data. Each block stores a start timestamp, a sample interval
+and the EXPECTED_COLS signals as contiguous typed arrays, so reading a range
+is a handful of np.frombuffer calls instead of one JSON decode per sample.
+Low-rate rows (patient_report, daily_summary) stay in sensor_streams.
+"""
+import os
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import SensorBlock, SensorStream
+
+BLOCK_SECONDS = 3600
+INTERVAL_TOLERANCE = 0.1  # fraction of the interval a sample may jitter before a block is split
+COLUMNS = [("accel_x", "<f4"), ("accel_y", "<f4"), ("accel_z", "<f4"),
+           ("emg", "<f4"), ("spo2", "<f4"), ("hr", "<f4"), ("step_count", "<i4")]
+
+# "rows" keeps one JSON sensor_streams row per sample, "blocks" packs wearable data into sensor_blocks
+STORAGE_MODE = os.getenv("SENSOR_STORAGE", "rows")
+
+def _encode(df: pd.DataFrame) -> bytes:
+    parts = []
+    for name, dtype in COLUMNS:
+        col = df[name].to_numpy(dtype=float)
+        if dtype == "<i4":
+            col = np.nan_to_num(col)
+        parts.append(col.astype(dtype).tobytes())
+    return b"".join(parts)
+
+def _decode(data: bytes, n: int) -> dict:
+    out, offset = {}, 0
+    for name, dtype in COLUMNS:
+        dt = np.dtype(dtype)
+        out[name] = np.frombuffer(data, dtype=dt, count=n, offset=offset)
+        offset += n * dt.itemsize
+    return out
+
+def pack_blocks(df: pd.DataFrame, timestamps, patient_id: int) -> list[dict]:
+    """Split samples into block rows. `timestamps` are naive UTC datetimes aligned with `df`."""
+    if not len(df):
+        return []
+    ts = pd.DatetimeIndex(timestamps).as_unit("ns").asi8
+    order = np.argsort(ts, kind="stable")
+    ts, df = ts[order], df.iloc[order]
+
+    diffs = np.diff(ts)
+    interval = float(np.median(diffs)) if len(diffs) else 0.0
+    window = ts // (BLOCK_SECONDS * 10**9)
+    breaks = np.zeros(len(ts), dtype=bool)
+    breaks[0] = True
+    breaks[1:] = (window[1:] != window[:-1]) | (np.abs(diffs - interval) > INTERVAL_TOLERANCE * interval)
+    starts = np.flatnonzero(breaks)
+    ends = np.append(starts[1:], len(ts))
+
+    rows = []
+    for a, b in zip(starts, ends):
+        rows.append({
+            "patient_id": patient_id,
+            "start_ts": pd.Timestamp(ts[a]).to_pydatetime(),
+            "end_ts": pd.Timestamp(ts[a] + (b - a - 1) * interval).to_pydatetime(),
+            "interval_ms": interval / 1e6,
+            "n_samples": int(b - a),
+            "data": _encode(df.iloc[a:b]),
+        })
+    return rows
+
+def store_blocks(db: Session, df: pd.DataFrame, timestamps, patient_id: int) -> int:
+    rows = pack_blocks(df, timestamps, patient_id)
+    if rows:
+        db.execute(insert(SensorBlock), rows)
+    return len(df)
+
+def read_range(db: Session, patient_id: int, start=None, end=None, include_rows: bool = True) -> dict:
+    """Return {"timestamp": datetime64[ns], <signal>: ndarray} for samples in [start, end].
+
+    With include_rows, wearable samples stored as JSON sensor_streams rows are
+    merged in so data ingested before blocks were enabled is still returned.
+    """
+    q = db.query(SensorBlock).filter(SensorBlock.patient_id == patient_id)
+    if start is not None:
+        q = q.filter(SensorBlock.end_ts >= start)
+    if end is not None:
+        q = q.filter(SensorBlock.start_ts <= end)
+    ts_parts, col_parts = [], {name: [] for name, _ in COLUMNS}
+    for blk in q.order_by(SensorBlock.start_ts):
+        step = np.int64(round(blk.interval_ms * 1e6))
+        ts_parts.append(np.datetime64(blk.start_ts, "ns") + np.arange(blk.n_samples, dtype=np.int64) * step)
+        for name, arr in _decode(blk.data, blk.n_samples).items():
+            col_parts[name].append(arr)
+
+    if include_rows:
+        q = db.query(SensorStream.timestamp, SensorStream.payload).filter(
+            SensorStream.patient_id == patient_id, SensorStream.sensor_type == "wearable_csv")
+        if start is not None:
+            q = q.filter(SensorStream.timestamp >= start)
+        if end is not None:
+            q = q.filter(SensorStream.timestamp <= end)
+        legacy = q.all()
+        if legacy:
+            ts_parts.append(np.array([t for t, _ in legacy], dtype="datetime64[ns]"))
+            payloads = [p for _, p in legacy]
+            accel = np.array([p.get("accel") or [np.nan] * 3 for p in payloads], dtype=float).astype(np.float32)
+            for i, axis in enumerate(("accel_x", "accel_y", "accel_z")):
+                col_parts[axis].append(accel[:, i])
+            for name, dtype in COLUMNS[3:]:
+                # JSON null (or NaN from old rows) for missing cells; integer columns get 0, as in _encode
+                col = np.array([p.get(name) for p in payloads], dtype=float)
+                if dtype == "<i4":
+                    col = np.nan_to_num(col)
+                col_parts[name].append(col.astype(dtype))
+
+    if not ts_parts:
+        return {"timestamp": np.array([], dtype="datetime64[ns]"),
+                **{name: np.array([], dtype=dtype) for name, dtype in COLUMNS}}
+    out = {"timestamp": np.concatenate(ts_parts)}
+    out.update({name: np.concatenate(parts) for name, parts in col_parts.items()})
+    mask = np.ones(len(out["timestamp"]), dtype=bool)
+    if start is not None:
+        mask &= out["timestamp"] >= np.datetime64(start, "ns")
+    if end is not None:
+        mask &= out["timestamp"] <= np.datetime64(end, "ns")
+    order = np.argsort(out["timestamp"][mask], kind="stable")
+    return {k: v[mask][order] for k, v in out.items()}
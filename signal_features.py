@@ -0,0 +1,69 @@
+"""Sliding-window feature extraction for wearable streams.
+
+Turns EXPECTED_COLS arrays (a parsed DataFrame or sensor_blocks.read_range
+output) into a [windows x WINDOW_FEATURES] matrix. Windows are strided views
+(numpy sliding_window_view), so every feature is one vectorized reduction and
+the total work is ~n / (1 - overlap) element ops regardless of window count.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+WINDOW_FEATURES = [
+    "acc_mag_mean", "acc_mag_std", "emg_rms", "hr_mean", "spo2_mean", "cadence_est",
+    "cadence_spm", "hr_std", "hr_range", "spo2_min", "spo2_dip_frac",
+]
+MODEL_COLUMNS = WINDOW_FEATURES[:6]  # same names/definitions as data_ingestion.compute_features
+SPO2_DIP_THRESHOLD = 92.0
+
+def _windows(x: np.ndarray, size: int, hop: int) -> np.ndarray:
+    return sliding_window_view(x, size)[::hop]
+
+def sample_interval(ts: np.ndarray) -> float:
+    """Median spacing between samples, in seconds."""
+    ts = ts.astype("datetime64[ns]")
+    diffs = np.diff(ts[~np.isnat(ts)].astype(np.int64))
+    return float(np.median(diffs)) / 1e9 if len(diffs) else 1.0
+
+def window_features(data, window_s: float = 30.0, overlap: float = 0.5):
+    """Return (window_start_times, matrix) with one row per window and WINDOW_FEATURES columns.
+
+    `data` maps EXPECTED_COLS names to equal-length arrays (DataFrame or dict). A
+    trailing partial window is dropped; a series shorter than one window yields no rows.
+    """
+    ts = np.asarray(data["timestamp"])
+    if ts.dtype.kind != "M":
+        ts = pd.to_datetime(pd.Series(ts), errors="coerce", utc=True).dt.tz_localize(None).to_numpy()
+    dt = sample_interval(ts) or 1.0
+    size = max(2, int(round(window_s / dt)))
+    hop = max(1, int(round(size * (1 - overlap))))
+    if len(ts) < size:
+        return ts[:0], np.empty((0, len(WINDOW_FEATURES)), dtype=np.float32)
+
+    col = lambda name: np.asarray(data[name], dtype=np.float64)
+    acc = _windows(np.sqrt(col("accel_x")**2 + col("accel_y")**2 + col("accel_z")**2), size, hop)
+    emg = _windows(col("emg"), size, hop)
+    hr = _windows(col("hr"), size, hop)
+    spo2 = _windows(col("spo2"), size, hop)
+    # positive step increments; the first sample of each window contributes 0 like diff().fillna(0)
+    step_inc = np.clip(np.diff(col("step_count"), prepend=np.nan), 0, None)
+    steps = _windows(np.nan_to_num(step_inc), size, hop)
+    steps = steps.sum(axis=1) - steps[:, 0]
+
+    out = np.empty((len(acc), len(WINDOW_FEATURES)), dtype=np.float64)
+    out[:, 0] = acc.mean(axis=1)
+    out[:, 1] = acc.std(axis=1, ddof=1)
+    out[:, 2] = np.sqrt(np.square(emg).mean(axis=1))
+    out[:, 3] = hr.mean(axis=1)
+    out[:, 4] = spo2.mean(axis=1)
+    out[:, 5] = steps / size * 60
+    out[:, 6] = steps / (size * dt / 60)
+    out[:, 7] = hr.std(axis=1, ddof=1)
+    out[:, 8] = hr.max(axis=1) - hr.min(axis=1)
+    out[:, 9] = spo2.min(axis=1)
+    out[:, 10] = (spo2 < SPO2_DIP_THRESHOLD).mean(axis=1)
+    return ts[::hop][:len(out)], out.astype(np.float32)
+
+def model_inputs(matrix: np.ndarray) -> np.ndarray:
+    """Per-window TwinModel feature columns (FEATURES order, without the scenario column)."""
+    return matrix[:, [WINDOW_FEATURES.index(c) for c in MODEL_COLUMNS]]
@@ -0,0 +1,125 @@
+"""Range queries over sensor_streams for the progress charts.
+
+Payload fields are extracted in SQL (json_extract / ->>) and time buckets are
+aggregated with GROUP BY, so no JSON blobs are decoded in Python. Everything
+filters on (patient_id, sensor_type, timestamp), which is covered by
+ix_sensor_streams_patient_type_ts. Wearable data stored as sensor_blocks
+(SENSOR_STORAGE=blocks) is decoded for the range and aggregated with numpy.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models import SensorStream
+from sensor_blocks import read_range
+
+MAX_POINTS = 2000  # per Plotly trace
+
+# daily_summary payload keys shown on the progress charts, and their raw wearable counterpart
+PROGRESS_METRICS = {"accel_mean": "Activity (mean accel)", "step_count": "Steps", "hr": "Heart rate",
+                    "spo2": "SpO2", "emg": "EMG"}
+WEARABLE_AGG = {"accel_mean": ("accel_mean", "avg"), "step_count": ("step_count", "max"), "hr": ("hr", "avg"),
+                "spo2": ("spo2", "avg"), "emg": ("emg", "avg")}
+# compaction.py rollups of old wearable rows share the daily_summary payload shape
+ROLLUP_AGG = {"accel_mean": "avg", "step_count": "max", "hr": "avg", "spo2": "avg", "emg": "avg"}
+ROLLUP_TYPES = ["minute_summary", "hour_summary"]
+
+_AGGS = {"avg": func.avg, "min": func.min, "max": func.max, "sum": func.sum, "count": func.count}
+
+def _range(db: Session, stmt, patient_id, sensor_type, start, end):
+    stmt = stmt.where(SensorStream.patient_id == patient_id, SensorStream.sensor_type == sensor_type)
+    if db.get_bind().dialect.name == "sqlite":
+        # rows written before build_rows nulled NaNs hold bare NaN tokens; json_extract would fail on them
+        stmt = stmt.where(func.json_valid(SensorStream.payload))
+    if start is not None:
+        stmt = stmt.where(SensorStream.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(SensorStream.timestamp <= end)
+    return stmt
+
+def _bucket(db: Session, bucket: str):
+    if db.get_bind().dialect.name == "sqlite":
+        fmt = {"day": "%Y-%m-%d 00:00:00", "hour": "%Y-%m-%d %H:00:00", "minute": "%Y-%m-%d %H:%M:00"}[bucket]
+        return func.strftime(fmt, SensorStream.timestamp)
+    return func.date_trunc(bucket, SensorStream.timestamp)
+
+def _field(sensor_type: str, field: str):
+    # raw rows store accel as [x, y, z]; their accel_mean is its magnitude, as in compaction.rollup
+    if sensor_type == "wearable_csv" and field == "accel_mean":
+        x, y, z = (SensorStream.payload[("accel", i)].as_float() for i in range(3))
+        return func.sqrt(x * x + y * y + z * z)
+    return SensorStream.payload[field].as_float()
+
+def _arrays(rows) -> tuple[np.ndarray, np.ndarray]:
+    if not rows:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype=float)
+    ts, values = zip(*rows)
+    return (pd.to_datetime(pd.Series(ts)).to_numpy(dtype="datetime64[ns]"),
+            np.array([np.nan if v is None else v for v in values], dtype=float))
+
+def fetch_series(db: Session, patient_id: int, sensor_type: str, field: str, start=None, end=None):
+    """Raw (timestamps, values) for one payload field, ordered by time."""
+    stmt = select(SensorStream.timestamp, SensorStream.payload[field].as_float())
+    stmt = _range(db, stmt, patient_id, sensor_type, start, end).order_by(SensorStream.timestamp)
+    return _arrays(db.execute(stmt).all())
+
+def bucketed_series(db: Session, patient_id: int, sensor_type: str, field: str, bucket: str = "day",
+                    agg: str = "avg", start=None, end=None):
+    """(bucket_start, aggregate) for one payload field, aggregated in SQL."""
+    b = _bucket(db, bucket).label("bucket")
+    stmt = select(b, _AGGS[agg](_field(sensor_type, field)))
+    stmt = _range(db, stmt, patient_id, sensor_type, start, end).group_by(b).order_by(b)
+    return _arrays(db.execute(stmt).all())
+
+def block_daily_series(db: Session, patient_id: int, field: str, agg: str = "avg", start=None, end=None):
+    """(day, aggregate) for one wearable field from sensor_blocks (accel_mean = accel magnitude)."""
+    data = read_range(db, patient_id, start, end, include_rows=False)
+    if not len(data["timestamp"]):
+        return _arrays([])
+    if field == "accel_mean":
+        values = np.sqrt(data["accel_x"].astype(float) ** 2 + data["accel_y"].astype(float) ** 2 +
+                         data["accel_z"].astype(float) ** 2)
+    else:
+        values = data[field].astype(float)
+    how = {"avg": "mean", "count": "size"}.get(agg, agg)
+    daily = pd.Series(values).groupby(pd.DatetimeIndex(data["timestamp"]).floor("D")).agg(how)
+    return daily.index.to_numpy(dtype="datetime64[ns]"), daily.to_numpy(dtype=float)
+
+def decimate(ts: np.ndarray, values: np.ndarray, max_points: int = MAX_POINTS):
+    """Min/max decimation: keep each bucket's extremes so spikes survive downsampling."""
+    n = len(values)
+    if n <= max_points:
+        return ts, values
+    buckets = max_points // 2
+    edges = np.linspace(0, n, buckets + 1, dtype=np.int64)
+    filled = np.where(np.isnan(values), np.nanmean(values), values)
+    starts, width = edges[:-1], np.diff(edges)
+    # pad buckets to equal width (repeating their last index) so argmin/argmax run as one op
+    grid = starts[:, None] + np.minimum(np.arange(int(width.max()))[None, :], width[:, None] - 1)
+    lo = starts + np.argmin(filled[grid], axis=1)
+    hi = starts + np.argmax(filled[grid], axis=1)
+    keep = np.unique(np.concatenate([lo, hi]))
+    return ts[keep], values[keep]
+
+def progress_series(db: Session, patient_id: int, metric: str, start=None, end=None, max_points: int = MAX_POINTS):
+    """Traces for a progress chart: daily summaries plus daily aggregates of raw wearable rows."""
+    traces = {}
+    ts, values = fetch_series(db, patient_id, "daily_summary", metric, start, end)
+    if len(ts):
+        traces["Daily summary"] = decimate(ts, values, max_points)
+    if metric in WEARABLE_AGG:
+        field, agg = WEARABLE_AGG[metric]
+        ts, values = bucketed_series(db, patient_id, "wearable_csv", field, "day", agg, start, end)
+        block_ts, block_values = block_daily_series(db, patient_id, field, agg, start, end)
+        if len(block_ts):  # blocks storage, or history spanning a switch between storage modes
+            merged = pd.Series(np.concatenate([values, block_values]), index=np.concatenate([ts, block_ts]))
+            merged = merged.groupby(level=0).agg("max" if agg == "max" else "mean")
+            ts, values = merged.index.to_numpy(dtype="datetime64[ns]"), merged.to_numpy(dtype=float)
+        if len(ts):
+            traces["Wearable (daily)"] = decimate(ts, values, max_points)
+    if metric in ROLLUP_AGG:
+        for sensor_type in ROLLUP_TYPES:
+            ts, values = bucketed_series(db, patient_id, sensor_type, metric, "day", ROLLUP_AGG[metric], start, end)
+            if len(ts):
+                traces[f"Wearable (compacted, {sensor_type.split('_')[0]})"] = decimate(ts, values, max_points)
+    return traces
@@ -1,16 +1,71 @@
-from passlib.context import CryptContext
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from models_root import User
 from sqlalchemy.orm import Session
+from util.perf import timed
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# One shared context for the whole app (login, seed, demo loader, admin user creation).
+# Changing BCRYPT_ROUNDS rehashes existing passwords transparently on their next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+_pwd_context = None
+
+_context_lock = threading.Lock()
+
+def get_pwd_context():
+    # passlib is imported on first use, not at app start (the app's warm-up thread gets here first)
+    global _pwd_context, _dummy_hash
+    if _pwd_context is None:
+        with _context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+                ctx = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+                # made with the context, so the first unknown-email login costs no more than later ones
+                _dummy_hash = ctx.hash("dummy-password-for-timing")
+                _pwd_context = ctx
+    return _pwd_context
+
+def __getattr__(name):
+    if name == "pwd_context":
+        return get_pwd_context()
+    raise AttributeError(name)
+
+# bcrypt releases the GIL, so a small thread pool runs hashes in parallel while capping
+# how many can saturate the CPU at once (e.g. a shift change of logins). Callers still wait
+# for their result: the pool bounds concurrency, it does not make a login non-blocking.
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", str(os.cpu_count() or 2)))
+_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+
+_dummy_hash = None
+
+def hash_password(plain: str) -> str:
+    return _executor.submit(get_pwd_context().hash, plain).result()
+
+def hash_passwords(plains: list[str]) -> list[str]:
+    """Hash many passwords in parallel (bulk user creation)."""
+    return list(_executor.map(get_pwd_context().hash, plains))
 
 def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+    return _executor.submit(get_pwd_context().verify, plain, hashed).result()
+
+def _verify_and_update(plain: str, hashed: str):
+    return _executor.submit(get_pwd_context().verify_and_update, plain, hashed).result()
+
+def _dummy_verify(plain: str):
+    # same cost as a real verify, so response time doesn't reveal whether the email exists
+    get_pwd_context()
+    verify_password(plain, _dummy_hash)
 
+@timed("authenticate")
 def authenticate(db: Session, email: str, password: str):
     user = db.query(User).filter(User.email==email).first()
     if not user:
+        _dummy_verify(password)
         return None
-    if not verify_password(password, user.hashed_password):
+    ok, new_hash = _verify_and_update(password, user.hashed_password)
+    if not ok:
         return None
+    if new_hash:  # cost factor changed since this hash was made
+        user.hashed_password = new_hash
+        db.commit()
     return user
@@ -0,0 +1,123 @@
+"""Lightweight hot-path instrumentation.
+
+`span(name)` / `@timed(name)` record wall time into the current trace (one per
+Streamlit rerun, opened with `trace()`); SQL statements are timed through
+SQLAlchemy cursor events. Finished traces go to a ring buffer and the slowest
+queries are kept separately for the admin Performance tab. With PERF_TRACE=0
+spans and timed functions reduce to a flag check.
+"""
+import functools
+import heapq
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+PERF_TRACES = int(os.getenv("PERF_TRACES", "200"))  # reruns kept in the ring buffer
+SLOW_QUERIES = int(os.getenv("PERF_SLOW_QUERIES", "25"))
+
+_enabled = os.getenv("PERF_TRACE", "1") == "1"
+_local = threading.local()
+_lock = threading.Lock()
+traces: deque = deque(maxlen=PERF_TRACES)
+_slow: list[tuple[float, int, dict]] = []  # min-heap of (ms, seq, query)
+_seq = 0
+_null = nullcontext()
+
+def enabled() -> bool:
+    return _enabled
+
+def set_enabled(on: bool):
+    global _enabled
+    _enabled = on
+
+def _record(kind: str, name: str, ms: float):
+    current = getattr(_local, "trace", None)
+    if current is not None:
+        current[kind].append((name, ms))
+
+@contextmanager
+def _span(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record("spans", name, (time.perf_counter() - t0) * 1000)
+
+def span(name: str):
+    return _span(name) if _enabled else _null
+
+def timed(name: str):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+@contextmanager
+def trace(label: str):
+    """Collect spans and queries for one unit of work (a Streamlit rerun) into the ring buffer."""
+    if not _enabled:
+        yield
+        return
+    current = {"label": label, "started": time.time(), "spans": [], "queries": []}
+    _local.trace = current
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        current["total_ms"] = (time.perf_counter() - t0) * 1000
+        _local.trace = None
+        traces.append(current)
+
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _enabled:
+            conn.info.setdefault("perf_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("perf_t0")
+        if not stack:
+            return
+        ms = (time.perf_counter() - stack.pop()) * 1000
+        sql = " ".join(statement.split())[:300]
+        _record("queries", sql, ms)
+        global _seq
+        with _lock:
+            _seq += 1
+            item = (ms, _seq, {"ms": round(ms, 3), "sql": sql, "executemany": executemany, "at": time.time()})
+            if len(_slow) < SLOW_QUERIES:
+                heapq.heappush(_slow, item)
+            elif ms > _slow[0][0]:
+                heapq.heapreplace(_slow, item)
+
+def slowest_queries() -> list[dict]:
+    with _lock:
+        return [q for _, _, q in sorted(_slow, reverse=True)]
+
+def span_durations() -> dict[str, list[float]]:
+    """{span or "sql" name: [ms, ...]} across all buffered traces."""
+    out: dict[str, list[float]] = {"rerun": []}
+    for t in list(traces):
+        out["rerun"].append(t["total_ms"])
+        for name, ms in t["spans"]:
+            out.setdefault(name, []).append(ms)
+        if t["queries"]:
+            out.setdefault("sql (per rerun)", []).append(sum(ms for _, ms in t["queries"]))
+    return out
+
+def reset():
+    global _seq
+    with _lock:
+        traces.clear()
+        _slow.clear()
+        _seq = 0
@@ -0,0 +1,63 @@
+"""Import-time profile of the app's cold start.
+
+    python -m util.startup_profile                 # modules app.py imports before the login page
+    python -m util.startup_profile models.model    # any other module(s)
+    python -m util.startup_profile --top 30
+
+Runs `python -X importtime -c "import <modules>"` in a fresh interpreter and
+prints the cumulative import cost per top-level package, so a heavy
+dependency (torch, pandas, plotly, passlib) creeping back into the startup
+path shows up immediately.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# what app.py imports at module level (streamlit itself excluded: it's loaded before the script runs)
+APP_IMPORTS = ["database", "models_root", "util.perf", "models.model", "prediction_cache"]
+HEAVY = ["torch", "pandas", "numpy", "plotly", "passlib", "reportlab", "sqlalchemy"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def import_times(modules: list[str]) -> list[tuple[str, int, int, int]]:
+    """[(module, self_us, cumulative_us, depth)] as reported by -X importtime."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "; ".join(f"import {m}" for m in modules)],
+                          cwd=root, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    out = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            out.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return out
+
+def by_package(rows) -> dict[str, int]:
+    """Self time summed per top-level package (us)."""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("modules", nargs="*", default=APP_IMPORTS)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args(argv)
+
+    rows = import_times(args.modules)
+    totals = by_package(rows)
+    total = sum(totals.values())
+    print(f"import {' '.join(args.modules)}: {total / 1000:.1f} ms total")
+    for pkg, us in sorted(totals.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {pkg:<24}{us / 1000:>9.1f} ms  {100 * us / max(total, 1):5.1f}%")
+    loaded = {name.split(".")[0] for name, *_ in rows}
+    heavy = [h for h in HEAVY if h in loaded]
+    print(f"heavy packages on this path: {', '.join(heavy) or 'none'}")
+
+if __name__ == "__main__":
+    main()